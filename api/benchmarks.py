@@ -0,0 +1,406 @@
+"""
+Benchmark scenarios, run with `manage.py benchmark <scenario>`.
+
+A scenario is a function which takes the options of the benchmark command and
+returns a mapping of measurement names to values, e.g. seconds or requests per
+second.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlencode, urljoin, urlparse
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.test import Client, override_settings
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .models import Counter, Observation
+from .renderers import FastCamelCaseJSONRenderer, ORJSONCamelCaseRenderer
+from .serializers import (
+    CounterFeatureSerializer,
+    CounterSerializer,
+    ObservationRowSerializer,
+    ObservationSerializer,
+)
+
+# Prints the seconds and database queries taken to load the URL configuration
+STARTUP_SCRIPT = """
+import time
+
+start = time.perf_counter()
+import django
+from django.db import connection
+
+django.setup()
+queries = []
+
+
+def count_query(execute, sql, params, many, context):
+    queries.append(sql)
+    return execute(sql, params, many, context)
+
+
+with connection.execute_wrapper(count_query):
+    import lidotiku.urls
+print(time.perf_counter() - start, len(queries))
+"""
+
+SCENARIOS: dict[str, Callable[[dict], dict[str, float]]] = {}
+
+
+def scenario(func):
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def best_of(repeat, func) -> float:
+    """Returns the shortest of `repeat` runs of the function in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def fetch(url) -> float:
+    """Requests the URL and returns the seconds taken to read the response."""
+    start = time.perf_counter()
+    with urlopen(url, timeout=600) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def get_many(client, path, count):
+    """Requests the path from the in-process client `count` times."""
+    for _ in range(count):
+        client.get(path)
+
+
+@scenario
+def mixed_traffic(options):
+    """
+    Sends slow and fast requests concurrently to a running server, one slow
+    request for every `--fast-per-slow` fast ones. Compare the results of the
+    WSGI and ASGI serving modes against the same database.
+    """
+    slow_url = urljoin(options["base_url"], options["slow_path"])
+    fast_url = urljoin(options["base_url"], options["fast_path"])
+    urls = [
+        slow_url if i % (options["fast_per_slow"] + 1) == 0 else fast_url
+        for i in range(options["requests"])
+    ]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+        durations = list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+
+    slow = [d for url, d in zip(urls, durations) if url == slow_url]
+    fast = [d for url, d in zip(urls, durations) if url == fast_url]
+    return {
+        "requests_per_second": len(urls) / elapsed,
+        "slow_median_seconds": statistics.median(slow),
+        "fast_median_seconds": statistics.median(fast),
+        "fast_p95_seconds": percentile(fast, 95),
+    }
+
+
+@scenario
+def aggregate_counters(options):
+    """
+    Requests the daily count aggregates of `--counters` counters from a running
+    server, first with one concurrent request per counter and then with all
+    the counters in one request.
+    """
+    counter_ids = list(
+        Counter.objects.exclude(last_stored_observation=None).values_list(
+            "id", flat=True
+        )[: options["counters"]]
+    )
+    url = urljoin(options["base_url"], "observations/aggregate/")
+    query = {"period": "day", "measurement_type": "count", "page_size": 10000}
+    separate_urls = [
+        f"{url}?{urlencode({**query, 'counter': counter_id})}"
+        for counter_id in counter_ids
+    ]
+    combined_url = (
+        f"{url}?{urlencode({**query, 'counter': ','.join(map(str, counter_ids))})}"
+    )
+
+    def separate_requests():
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            list(executor.map(fetch, separate_urls))
+
+    separate_seconds = best_of(options["repeat"], separate_requests)
+    combined_seconds = best_of(options["repeat"], partial(fetch, combined_url))
+    return {
+        "counters": len(counter_ids),
+        "separate_requests_seconds": separate_seconds,
+        "combined_request_seconds": combined_seconds,
+        "speedup": separate_seconds / combined_seconds,
+    }
+
+
+@scenario
+def counter_serialization(options):
+    """
+    Queries and serializes a page of `--page-size` counters as GeoJSON features
+    with CounterSerializer and with CounterFeatureSerializer.
+    """
+    page_size = options["page_size"]
+
+    def model_serializer():
+        return CounterSerializer(Counter.objects.all()[:page_size], many=True).data
+
+    def feature_serializer():
+        rows = CounterFeatureSerializer.get_rows(Counter.objects.all())
+        return CounterFeatureSerializer(rows[:page_size]).data
+
+    features = feature_serializer()
+    if features != model_serializer():
+        raise RuntimeError("The serializers produce different output.")
+    model_seconds = best_of(options["repeat"], model_serializer)
+    feature_seconds = best_of(options["repeat"], feature_serializer)
+    return {
+        "features": len(features),
+        "counter_serializer_seconds": model_seconds,
+        "counter_feature_serializer_seconds": feature_seconds,
+        "speedup": model_seconds / feature_seconds,
+    }
+
+
+@scenario
+def observation_serialization(options):
+    """
+    Queries and serializes a page of `--page-size` observations with
+    ObservationSerializer and with ObservationRowSerializer.
+    """
+    page_size = options["page_size"]
+    request = Request(APIRequestFactory().get("/api/observations/"))
+    queryset = Observation.objects.order_by("-datetime")
+
+    def model_serializer():
+        return ObservationSerializer(
+            queryset[:page_size], many=True, context={"request": request}
+        ).data
+
+    def row_serializer():
+        rows = ObservationRowSerializer.get_rows(queryset)[:page_size]
+        return ObservationRowSerializer(rows, request).data
+
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        observations = row_serializer()
+        if observations != model_serializer():
+            raise RuntimeError("The serializers produce different output.")
+        model_seconds = best_of(options["repeat"], model_serializer)
+        row_seconds = best_of(options["repeat"], row_serializer)
+    return {
+        "observations": len(observations),
+        "observation_serializer_rows_per_second": len(observations) / model_seconds,
+        "observation_row_serializer_rows_per_second": len(observations) / row_seconds,
+        "speedup": model_seconds / row_seconds,
+    }
+
+
+@scenario
+def json_rendering(options):
+    """
+    Renders a page of `--page-size` observations as camelCase JSON with
+    CamelCaseJSONRenderer, FastCamelCaseJSONRenderer and
+    ORJSONCamelCaseRenderer.
+    """
+    rows = Observation.objects.values()[: options["page_size"]]
+    data = {"next": None, "previous": None, "results": list(rows)}
+    renderers = {
+        "camel_case_renderer": CamelCaseJSONRenderer(),
+        "fast_camel_case_renderer": FastCamelCaseJSONRenderer(),
+        "orjson_camel_case_renderer": ORJSONCamelCaseRenderer(),
+    }
+
+    outputs = {renderer.render(data) for renderer in renderers.values()}
+    if len(outputs) > 1:
+        raise RuntimeError("The renderers produce different output.")
+    size = len(outputs.pop())
+    results = {"rows": len(data["results"]), "bytes": size}
+    for name, renderer in renderers.items():
+        seconds = best_of(options["repeat"], partial(renderer.render, data))
+        results[f"{name}_seconds"] = seconds
+        results[f"{name}_bytes_per_second"] = size / seconds
+    return results
+
+
+def get_endpoint_requests(counter) -> dict[str, Callable]:
+    """
+    Returns the requests of the endpoints scenario by name, each as a function
+    taking the in-process client. The requests query around the counter.
+    """
+    longitude, latitude = counter.geom.x, counter.geom.y
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [
+            [
+                [longitude - 0.05, latitude - 0.05],
+                [longitude + 0.05, latitude - 0.05],
+                [longitude + 0.05, latitude + 0.05],
+                [longitude - 0.05, latitude + 0.05],
+                [longitude - 0.05, latitude - 0.05],
+            ]
+        ],
+    }
+    observations = {"counter": counter.id, "page_size": 1000}
+    first_page = f"/api/observations/?{urlencode(observations)}"
+
+    def get(endpoint, **query):
+        return partial(_get, path=f"/api/{endpoint}?{urlencode(query)}")
+
+    def next_cursor_page(client):
+        response = _get(client, first_page)
+        return _get(client, response.json()["next"])
+
+    def polygon_search(client):
+        return _check(
+            client.post("/api/counters/", polygon, content_type="application/json")
+        )
+
+    requests = {
+        "counters_page": get("counters/", page_size=100),
+        "counters_distance": get(
+            "counters/", latitude=latitude, longitude=longitude, distance=5000
+        ),
+        "counters_polygon": polygon_search,
+        "counters_geojson": get("counters/", format="geojson"),
+        "counters_csv": get("counters/", format="csv", page_size=100),
+        "observations_cursor_page": partial(_get, path=first_page),
+        "observations_next_cursor_page": next_cursor_page,
+        "observations_page_number_page": get("observations/", page=2, **observations),
+        "observations_csv_page": get("observations/", format="csv", **observations),
+        "observations_export_csv": get(
+            "observations/export/", counter=counter.id, format="csv"
+        ),
+    }
+    for period in ("hour", "day", "month", "year"):
+        requests[f"aggregate_{period}"] = get(
+            "observations/aggregate/",
+            counter=counter.id,
+            period=period,
+            measurement_type="count",
+            page_size=1000,
+        )
+    requests["aggregate_day_csv"] = get(
+        "observations/aggregate/",
+        counter=counter.id,
+        period="day",
+        measurement_type="count",
+        page_size=1000,
+        format="csv",
+    )
+    return requests
+
+
+def _get(client, path):
+    return _check(client.get(path))
+
+
+def _check(response):
+    if response.status_code != 200:
+        raise RuntimeError(
+            f"{response.request['PATH_INFO']} returned {response.status_code}."
+        )
+    # Consumes streamed responses like a client reading them
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+@scenario
+def endpoints(options):
+    """
+    Requests each endpoint and query shape in process, with the response
+    cache disabled: counter searches, observation pages with the cursor and
+    page number paginations, aggregates of each period and the CSV formats.
+    Run against a database filled by `manage.py generate_synthetic_data` and
+    save the results with `--save` to compare them across commits.
+    """
+    counter = (
+        Counter.objects.exclude(last_stored_observation=None)
+        .order_by("-last_stored_observation", "id")
+        .first()
+    )
+    if counter is None:
+        raise RuntimeError("No counter has observations.")
+
+    results = {}
+    with override_settings(API_CACHE_ENABLED=False, ALLOWED_HOSTS=["testserver"]):
+        client = Client()
+        for name, request in get_endpoint_requests(counter).items():
+            # The first request warms up the connection and the query plans
+            request(client)
+            results[f"{name}_seconds"] = best_of(
+                options["repeat"], partial(request, client)
+            )
+    return results
+
+
+@scenario
+def metrics_overhead(options):
+    """
+    Sends `--requests` requests for `--fast-path` in process, with and without
+    RequestMetricsMiddleware, to measure the overhead of recording metrics.
+    """
+    path = urlparse(urljoin(options["base_url"], options["fast_path"])).path
+    middleware = {
+        "without_metrics": [
+            name
+            for name in settings.MIDDLEWARE
+            if name != "api.middleware.RequestMetricsMiddleware"
+        ],
+        "with_metrics": settings.MIDDLEWARE,
+    }
+    results = {}
+    for name, classes in middleware.items():
+        with override_settings(MIDDLEWARE=classes, ALLOWED_HOSTS=["testserver"]):
+            client = Client()
+            client.get(path)
+            seconds = best_of(
+                options["repeat"], partial(get_many, client, path, options["requests"])
+            )
+        results[f"{name}_seconds_per_request"] = seconds / options["requests"]
+    results["overhead_seconds_per_request"] = (
+        results["with_metrics_seconds_per_request"]
+        - results["without_metrics_seconds_per_request"]
+    )
+    return results
+
+
+@scenario
+def startup(options):
+    """
+    Sets up Django and imports the URL configuration with all views in a new
+    interpreter, like a starting worker does.
+    """
+    durations = []
+    for _ in range(options["repeat"]):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        durations.append(float(output[0]))
+        queries = int(output[1])
+    return {"startup_seconds": min(durations), "startup_queries": queries}
@@ -0,0 +1,140 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Counter
+
+DATA_VERSION_CACHE_KEY = "api:data-version"
+RESPONSE_CACHE_KEY_PREFIX = "api:response"
+
+
+def get_latest_stored_observation() -> datetime | None:
+    return Counter.objects.aggregate(latest=Max("last_stored_observation"))["latest"]
+
+
+def get_data_version(latest_observation: datetime | None = None) -> str:
+    """
+    Identifies the currently loaded data. Changes whenever new observations
+    are stored or the data version marker is bumped. The latest stored
+    observation is queried unless given.
+    """
+    if latest_observation is None:
+        latest_observation = get_latest_stored_observation()
+    marker = cache.get(DATA_VERSION_CACHE_KEY, 0)
+    return f"{latest_observation.isoformat() if latest_observation else ''}:{marker}"
+
+
+def is_cache_shared() -> bool:
+    """
+    Tells whether the cache is shared between processes. A data version
+    bumped in a local memory cache only invalidates the responses cached by
+    the same process, not those of the server's workers.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache | DummyCache)
+
+
+def bump_data_version():
+    """
+    Invalidates all cached responses, in every process only if the cache is
+    shared, see `is_cache_shared`.
+    """
+    try:
+        cache.incr(DATA_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(DATA_VERSION_CACHE_KEY, 1, timeout=None)
+
+
+def get_response_digest(request, data_version: str) -> str:
+    """Identifies the response to a request for the given data version."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    key = "|".join(
+        [
+            data_version,
+            request.build_absolute_uri(request.path),
+            query,
+            request.accepted_media_type,
+        ]
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_response_cache_key(request, data_version: str) -> str:
+    return f"{RESPONSE_CACHE_KEY_PREFIX}:{get_response_digest(request, data_version)}"
+
+
+def cache_response(view_method):
+    """
+    Caches the rendered response of a viewset method by the full query string
+    and format, until the data version changes. The data version computed by
+    an outer `conditional_response` is reused.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not settings.API_CACHE_ENABLED or request.method != "GET":
+            return view_method(self, request, *args, **kwargs)
+
+        data_version = getattr(request, "data_version", None) or get_data_version()
+        cache_key = get_response_cache_key(request, data_version)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    cache_key,
+                    (rendered.content, rendered["Content-Type"]),
+                    timeout=settings.API_CACHE_TIMEOUT,
+                )
+            )
+        return response
+
+    return wrapper
+
+
+def conditional_response(view_method):
+    """
+    Validates the responses of a viewset method with an ETag and a
+    Last-Modified date derived from the `get_last_modified(request)` method
+    of the viewset, the query string and the format. Requests whose
+    If-None-Match or If-Modified-Since match get 304 Not Modified without
+    calling the method. The data version is stored in `request.data_version`
+    for the method.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view_method(self, request, *args, **kwargs)
+
+        last_modified = self.get_last_modified(request)
+        request.data_version = get_data_version(last_modified)
+        etag = quote_etag(get_response_digest(request, request.data_version))
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    return wrapper
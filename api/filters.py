@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.gis.measure import Distance as DistanceObject
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db.models import F
@@ -105,6 +106,20 @@ class CounterFilter(FilterSet):
         return queryset
 
 
+class CounterTileFilter(CounterFilter):
+    # Tiles are only filtered by the counter attributes
+    latitude = None
+    longitude = None
+    distance = None
+
+
+START_DATE_LABEL = (
+    "Start date of measurement period. Defaults to "
+    f"{settings.OBSERVATION_DEFAULT_LOOKBACK_DAYS} days before the end date, or "
+    "before the latest observation of the selected counters."
+)
+
+
 class ObservationFilter(FilterSet):
     counter = NumberInFilter(
         field_name="counter",
@@ -115,7 +130,7 @@ class ObservationFilter(FilterSet):
     start_date = DateFilter(
         field_name="datetime",
         lookup_expr="gte",
-        label="Start date of measurement period.",
+        label=START_DATE_LABEL,
     )
     end_date = DateFilter(
         field_name="datetime",
@@ -144,16 +159,17 @@ class ObservationFilter(FilterSet):
 
 
 class ObservationAggregateFilter(FilterSet):
-    counter = NumberFilter(
+    counter = NumberInFilter(
         field_name="counter",
         required=True,
-        lookup_expr="exact",
-        label="Counter id, aggregates observations of selected counter.",
+        lookup_expr="in",
+        label="Counter id, aggregates observations of selected counter. Separate \
+            values with commas to aggregate multiple counters in one request.",
     )
     start_date = DateFilter(
         field_name="datetime",
         lookup_expr="gte",
-        label="Start date of measurement period.",
+        label=START_DATE_LABEL,
     )
     end_date = DateFilter(
         field_name="datetime",
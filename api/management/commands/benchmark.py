@@ -0,0 +1,150 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import SCENARIOS
+
+# Saved results, one JSON file per commit
+RESULTS_DIR = settings.BASE_DIR / "benchmark-results"
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs benchmark scenarios and prints their measurements, optionally "
+        "saving them for the current commit and comparing them to the saved "
+        "measurements of another commit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="+",
+            choices=sorted(SCENARIOS),
+            help="Scenarios to run.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of timed runs, of which the fastest is reported. "
+            "Defaults to 5.",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=1000,
+            help="Number of rows serialized per run. Defaults to 1000.",
+        )
+        parser.add_argument(
+            "--base-url",
+            default="http://localhost:8080/api/",
+            help="API root of the server for the HTTP scenarios.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Number of HTTP requests to send. Defaults to 200.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Number of HTTP requests in flight at once. Defaults to 20.",
+        )
+        parser.add_argument(
+            "--counters",
+            type=int,
+            default=50,
+            help="Number of counters aggregated. Defaults to 50.",
+        )
+        parser.add_argument(
+            "--slow-path",
+            default="observations/?page=1&page_size=10000&count_exact=true",
+            help="Path of the slow request, relative to the base URL.",
+        )
+        parser.add_argument(
+            "--fast-path",
+            default="metadata/sources/",
+            help="Path of the fast request, relative to the base URL.",
+        )
+        parser.add_argument(
+            "--fast-per-slow",
+            type=int,
+            default=9,
+            help="Number of fast requests sent for each slow one. Defaults to 9.",
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help="Save the measurements for the current commit in "
+            f"{RESULTS_DIR.name}/, replacing the earlier ones of the scenarios run.",
+        )
+        parser.add_argument(
+            "--compare",
+            metavar="REF",
+            help="Print the measurements next to the saved ones of the commit, "
+            "e.g. main or HEAD~1.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if options["compare"]:
+            baseline_path = RESULTS_DIR / f"{get_commit(options['compare'])}.json"
+            if not baseline_path.exists():
+                raise CommandError(f"No saved results in {baseline_path}.")
+            baseline = json.loads(baseline_path.read_text())
+
+        results = {}
+        for name in options["scenarios"]:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            results[name] = SCENARIOS[name](options)
+            for measurement, value in results[name].items():
+                line = f"  {measurement}: {value:.4f}"
+                baseline_value = baseline.get(name, {}).get(measurement)
+                if baseline_value is not None:
+                    line += f" (baseline {baseline_value:.4f}"
+                    if baseline_value:
+                        line += f", {value / baseline_value:.2f}x"
+                    line += ")"
+                self.stdout.write(line)
+
+        if options["save"]:
+            commit = get_commit("HEAD")
+            if is_dirty():
+                commit += "-dirty"
+            path = RESULTS_DIR / f"{commit}.json"
+            saved = json.loads(path.read_text()) if path.exists() else {}
+            RESULTS_DIR.mkdir(exist_ok=True)
+            path.write_text(json.dumps({**saved, **results}, indent=2) + "\n")
+            self.stdout.write(f"Saved the results in {path}.")
+
+
+def get_commit(ref: str) -> str:
+    """Returns the short hash of the commit, keeping a -dirty suffix."""
+    commit, dirty, _ = ref.partition("-dirty")
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", commit],
+            cwd=settings.BASE_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as error:
+        raise CommandError(f"Cannot resolve the commit {ref}: {error}") from error
+    return output.strip() + dirty
+
+
+def is_dirty() -> bool:
+    """Tells whether the working tree has uncommitted changes."""
+    output = subprocess.run(
+        ["git", "status", "--porcelain", "--untracked-files=no"],
+        cwd=settings.BASE_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return bool(output.strip())
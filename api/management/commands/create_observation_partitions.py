@@ -0,0 +1,89 @@
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from psycopg import sql
+
+from api.management.commands.observation_indexes import VIEW_TABLES_QUERY
+
+PARTITION_KEY_QUERY = "SELECT pg_get_partkeydef(%s::regclass)"
+
+
+def add_months(month: date, months: int) -> date:
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the monthly partitions of the tables behind lido.vw_observations "
+        "which are partitioned by range of datetime."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of months after the current one to create partitions "
+            "for. Defaults to 3.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the statements without running them.",
+        )
+
+    def handle(self, *args, **options):
+        this_month = timezone.localdate().replace(day=1)
+        months = [
+            add_months(this_month, offset)
+            for offset in range(options["months_ahead"] + 1)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(VIEW_TABLES_QUERY)
+            tables = cursor.fetchall()
+            for schema, table in tables:
+                cursor.execute(
+                    PARTITION_KEY_QUERY,
+                    [sql.Identifier(schema, table).as_string(connection.connection)],
+                )
+                partition_key = cursor.fetchone()[0]
+                if partition_key != "RANGE (datetime)":
+                    continue
+
+                for month in months:
+                    statement = self.get_create_statement(schema, table, month)
+                    if options["dry_run"]:
+                        self.stdout.write(statement)
+                    else:
+                        cursor.execute(statement)
+                if not options["dry_run"]:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"Created partitions of {schema}.{table} until "
+                            f"{months[-1]:%Y-%m}."
+                        )
+                    )
+
+    @staticmethod
+    def get_create_statement(schema, table, month):
+        # Months start at local midnight, like the aggregate periods
+        start, end = (
+            timezone.make_aware(datetime.combine(day, time.min)).isoformat()
+            for day in (month, add_months(month, 1))
+        )
+        return (
+            sql.SQL(
+                "CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table} "
+                "FOR VALUES FROM ({start}) TO ({end})"
+            )
+            .format(
+                partition=sql.Identifier(schema, f"{table}_{month:%Y%m}"),
+                table=sql.Identifier(schema, table),
+                start=sql.Literal(start),
+                end=sql.Literal(end),
+            )
+            .as_string(connection.connection)
+        )
@@ -0,0 +1,321 @@
+import math
+import random
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.caching import bump_data_version, is_cache_shared
+from api.utils import refresh_source_choices
+
+# Schema of the development database, with the tables behind the lido views
+SCHEMA_PATH = settings.BASE_DIR / ".devcontainer" / "db_init.sql"
+
+# Sources written to, by the prefix of their counter and observation tables.
+# Counter ids of each source start from its own offset to be unique in
+# lido.vw_counters.
+SOURCES = {
+    "EcoCounter": {
+        "table": "ecocounter",
+        "id_offset": 100000,
+        "vehicletypes": ["bicycle", "pedestrian"],
+        "description": "Bicycle and pedestrian counters",
+    },
+    "InfoTripla": {
+        "table": "infotripla",
+        "id_offset": 200000,
+        "vehicletypes": ["car"],
+        "description": "Traffic counters at intersections",
+    },
+    "Marksman": {
+        "table": "marksman",
+        "id_offset": 300000,
+        "vehicletypes": ["car", "truck", "bus"],
+        "description": "Classifying traffic counters",
+    },
+    "M680": {
+        "table": "m680_aggregates",
+        "id_offset": 400000,
+        "vehicletypes": ["car", "truck", "bus", "motorcycle"],
+        "description": "Classifying radar counters",
+    },
+}
+
+# Centers of the municipalities by their code, as latitude and longitude
+MUNICIPALITIES = {
+    91: (60.1699, 24.9384),
+    49: (60.2055, 24.6559),
+    92: (60.2934, 25.0378),
+}
+
+DIRECTIONS = ["in", "out"]
+INTERVAL = timedelta(minutes=15)
+
+# Share of the daily traffic by local hour, peaking in the morning and afternoon
+HOURLY_PROFILE = (
+    "ARRAY[0.2,0.1,0.1,0.1,0.2,0.5,1.2,2.2,2.4,1.6,1.3,1.3,"
+    "1.4,1.4,1.5,1.9,2.4,2.3,1.6,1.2,0.9,0.7,0.5,0.3]"
+)
+
+OBSERVATIONS_QUERY = f"""
+    INSERT INTO lido.{{table}}_observations (
+        id, direction, value, unit, typeofmeasurement,
+        phenomenondurationseconds, vehicletype, datetime, source
+    )
+    SELECT
+        counter.id,
+        direction,
+        CASE typeofmeasurement
+            WHEN 'count' THEN round(
+                counter.volume
+                * ({HOURLY_PROFILE})[
+                    extract(hour FROM series.datetime AT TIME ZONE %(time_zone)s)::int
+                    + 1
+                ]
+                * (0.5 + random())
+            )
+            ELSE round(30 + 20 * random())
+        END,
+        CASE typeofmeasurement WHEN 'count' THEN 'pcs' ELSE 'km/h' END,
+        typeofmeasurement,
+        %(interval)s,
+        vehicletype,
+        series.datetime,
+        %(source)s
+    FROM unnest(%(counter_ids)s::bigint[], %(volumes)s::int[], %(classifying)s::bool[])
+        AS counter(id, volume, classifying)
+    CROSS JOIN generate_series(
+        %(start)s::timestamptz, %(end)s::timestamptz, %(interval)s * interval '1 second'
+    ) AS series(datetime)
+    CROSS JOIN unnest(%(directions)s::varchar[]) AS direction
+    CROSS JOIN unnest(%(vehicletypes)s::varchar[]) AS vehicletype
+    CROSS JOIN unnest(ARRAY['count', 'speed']) AS typeofmeasurement
+    WHERE typeofmeasurement = 'count' OR counter.classifying
+    ORDER BY series.datetime, counter.id
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the tables behind the lido views with synthetic counters of "
+        f"{', '.join(SOURCES)} in {len(MUNICIPALITIES)} municipalities and "
+        "their observations at 15 minute intervals, for benchmarks against a "
+        "local database. The same options, seed and end produce the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--counters",
+            type=int,
+            default=100,
+            help="Number of counters, spread over the sources. Defaults to 100.",
+        )
+        parser.add_argument(
+            "--observations",
+            type=int,
+            default=1_000_000,
+            help="Approximate number of observations. Each counter measures "
+            "both directions of each vehicle type, and classifying counters "
+            "speed too. Defaults to 1000000.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the random data. Defaults to 0.",
+        )
+        parser.add_argument(
+            "--end",
+            type=datetime.fromisoformat,
+            help="Datetime of the last observations in ISO 8601 format. "
+            "Defaults to now.",
+        )
+        parser.add_argument(
+            "--create-schema",
+            action="store_true",
+            help=f"Create the lido schema from {SCHEMA_PATH.name} if it does "
+            "not exist.",
+        )
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Delete the existing rows of the tables of the sources first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["counters"] < 1 or options["observations"] < 1:
+            raise CommandError("--counters and --observations must be positive.")
+        if not self.schema_exists():
+            if not options["create_schema"]:
+                raise CommandError(
+                    "The lido schema does not exist, use --create-schema."
+                )
+            self.create_schema()
+
+        rng = random.Random(options["seed"])
+        counters = self.get_counters(options["counters"], rng)
+        series = sum(
+            len(DIRECTIONS)
+            * len(SOURCES[counter["source"]]["vehicletypes"])
+            * (2 if counter["classifying"] else 1)
+            for counter in counters
+        )
+        steps = max(1, math.ceil(options["observations"] / series))
+        end = options["end"] or timezone.now()
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end)
+        end = end.replace(second=0, microsecond=0) - timedelta(minutes=end.minute % 15)
+        start = end - (steps - 1) * INTERVAL
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if options["replace"]:
+                self.delete_sources(cursor)
+            elif self.has_rows(cursor):
+                raise CommandError(
+                    "The tables of the sources have rows, use --replace to "
+                    "delete them first."
+                )
+            cursor.execute("SELECT setseed(%s)", [rng.random() * 2 - 1])
+            self.insert_sources(cursor)
+            total = 0
+            for source, config in SOURCES.items():
+                source_counters = [c for c in counters if c["source"] == source]
+                if not source_counters:
+                    continue
+                self.insert_counters(cursor, config, source_counters, start, end)
+                cursor.execute(
+                    OBSERVATIONS_QUERY.format(table=config["table"]),
+                    {
+                        "counter_ids": [c["id"] for c in source_counters],
+                        "volumes": [c["volume"] for c in source_counters],
+                        "classifying": [c["classifying"] for c in source_counters],
+                        "start": start,
+                        "end": end,
+                        "interval": int(INTERVAL.total_seconds()),
+                        "directions": DIRECTIONS,
+                        "vehicletypes": config["vehicletypes"],
+                        "source": source,
+                        "time_zone": settings.TIME_ZONE,
+                    },
+                )
+                total += cursor.rowcount
+
+        # Planner statistics of the new rows
+        with connection.cursor() as cursor:
+            for config in SOURCES.values():
+                for kind in ("counters", "observations"):
+                    cursor.execute(f"ANALYZE lido.{config['table']}_{kind}")
+        refresh_source_choices()
+        bump_data_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {len(counters)} counters and {total} observations "
+                f"from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}."
+            )
+        )
+        if not is_cache_shared():
+            self.stderr.write(
+                self.style.WARNING(
+                    "The cache is local to this process, restart a running "
+                    "server to drop the responses it has cached."
+                )
+            )
+
+    @staticmethod
+    def schema_exists() -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_namespace WHERE nspname = 'lido'",
+            )
+            return cursor.fetchone() is not None
+
+    def create_schema(self):
+        with connection.cursor() as cursor:
+            cursor.execute(SCHEMA_PATH.read_text())
+            # The dump clears the search path of the session
+            cursor.execute("RESET search_path")
+        self.stdout.write(f"Created the lido schema from {SCHEMA_PATH}.")
+
+    @staticmethod
+    def get_counters(count, rng) -> list[dict]:
+        sources = list(SOURCES)
+        counters = []
+        for index in range(count):
+            source = sources[index % len(sources)]
+            municipality_code = rng.choice(list(MUNICIPALITIES))
+            center_latitude, center_longitude = MUNICIPALITIES[municipality_code]
+            counters.append(
+                {
+                    "id": SOURCES[source]["id_offset"] + index,
+                    "name": f"{source} {index + 1}",
+                    "source": source,
+                    "municipality_code": municipality_code,
+                    "latitude": round(rng.gauss(center_latitude, 0.02), 6),
+                    "longitude": round(rng.gauss(center_longitude, 0.04), 6),
+                    "classifying": len(SOURCES[source]["vehicletypes"]) > 2,
+                    # Mean observation of an hour at the daily average
+                    "volume": rng.randint(5, 200),
+                }
+            )
+        return counters
+
+    @staticmethod
+    def has_rows(cursor) -> bool:
+        for config in SOURCES.values():
+            cursor.execute(
+                f"SELECT EXISTS (SELECT FROM lido.{config['table']}_counters)"
+            )
+            if cursor.fetchone()[0]:
+                return True
+        return False
+
+    @staticmethod
+    def delete_sources(cursor):
+        tables = ", ".join(
+            f"lido.{config['table']}_{kind}"
+            for config in SOURCES.values()
+            for kind in ("counters", "observations")
+        )
+        cursor.execute(f"TRUNCATE {tables}")
+
+    @staticmethod
+    def insert_sources(cursor):
+        cursor.executemany(
+            """
+            INSERT INTO lido.data_sources (
+                name, description_fi, description_sv, description_en, license
+            )
+            VALUES (%s, %s, %s, %s, 'CC BY 4.0')
+            ON CONFLICT (name) DO NOTHING
+            """,
+            [
+                (
+                    source,
+                    config["description"],
+                    config["description"],
+                    config["description"],
+                )
+                for source, config in SOURCES.items()
+            ],
+        )
+
+    @staticmethod
+    def insert_counters(cursor, config, counters, start, end):
+        cursor.executemany(
+            f"""
+            INSERT INTO lido.{config["table"]}_counters (
+                id, name, classifying, longitude, latitude, crs_epsg, source,
+                geom, data_received, first_stored_observation,
+                last_stored_observation, municipality_code
+            )
+            VALUES (
+                %(id)s, %(name)s, %(classifying)s, %(longitude)s, %(latitude)s,
+                4326, %(source)s,
+                ST_SetSRID(ST_MakePoint(%(longitude)s, %(latitude)s), 4326),
+                true, %(start)s, %(end)s, %(municipality_code)s
+            )
+            """,
+            [{**counter, "start": start, "end": end} for counter in counters],
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.caching import bump_data_version, is_cache_shared
+
+
+class Command(BaseCommand):
+    help = (
+        "Invalidates cached API responses by bumping the data version marker. "
+        "Requires a cache shared with the server, see the CACHE_URL setting."
+    )
+
+    def handle(self, *args, **options):
+        if not is_cache_shared():
+            raise CommandError(
+                "The cache is local to this process, so the responses cached by "
+                "the server cannot be invalidated. Set CACHE_URL to a shared "
+                "cache, e.g. redis://redis:6379/0."
+            )
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS("Bumped the data version."))
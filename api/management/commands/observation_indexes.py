@@ -0,0 +1,293 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import Trunc
+from psycopg import sql
+
+from api.filters import ObservationAggregateFilter, ObservationFilter
+from api.models import Counter, Observation
+from api.paginators import ObservationsCursorPagination
+from api.views import ObservationViewSet
+
+# Tables selected from by lido.vw_observations
+VIEW_TABLES_QUERY = """
+    SELECT DISTINCT table_namespace.nspname, table_class.relname
+    FROM pg_depend
+    JOIN pg_rewrite ON pg_depend.objid = pg_rewrite.oid
+    JOIN pg_class AS view_class ON pg_rewrite.ev_class = view_class.oid
+    JOIN pg_namespace AS view_namespace
+        ON view_class.relnamespace = view_namespace.oid
+    JOIN pg_class AS table_class ON pg_depend.refobjid = table_class.oid
+    JOIN pg_namespace AS table_namespace
+        ON table_class.relnamespace = table_namespace.oid
+    WHERE pg_depend.classid = 'pg_rewrite'::regclass
+        AND pg_depend.refclassid = 'pg_class'::regclass
+        AND view_namespace.nspname = 'lido'
+        AND view_class.relname = 'vw_observations'
+        AND table_class.relkind IN ('r', 'p')
+    ORDER BY 1, 2
+"""
+
+# Key columns with their direction, and included columns of each index
+INDEXES_QUERY = """
+    SELECT
+        index_class.relname,
+        access_method.amname,
+        ARRAY(
+            SELECT pg_get_indexdef(pg_index.indexrelid, key + 1, true)
+            FROM generate_series(0, pg_index.indnkeyatts - 1) AS key
+            ORDER BY key
+        ),
+        ARRAY(
+            SELECT pg_index.indoption[key] & 1 = 1
+            FROM generate_series(0, pg_index.indnkeyatts - 1) AS key
+            ORDER BY key
+        ),
+        ARRAY(
+            SELECT pg_get_indexdef(pg_index.indexrelid, key + 1, true)
+            FROM generate_series(pg_index.indnkeyatts, pg_index.indnatts - 1) AS key
+            ORDER BY key
+        )
+    FROM pg_index
+    JOIN pg_class AS index_class ON pg_index.indexrelid = index_class.oid
+    JOIN pg_am AS access_method ON index_class.relam = access_method.oid
+    WHERE pg_index.indrelid = %s::regclass AND pg_index.indisvalid
+"""
+
+COLUMNS_QUERY = """
+    SELECT column_name FROM information_schema.columns
+    WHERE table_schema = %s AND table_name = %s
+"""
+
+# Indexes matching the query shapes of the observation endpoints. The key
+# columns are (column, descending) pairs, "counter" stands for the column
+# selected as the counter id by the view.
+INDEX_SPECS = {
+    # Cursor pagination of the observation list and export, see
+    # ObservationsCursorPagination.ordering
+    "ordering": {
+        "method": "btree",
+        "keys": [
+            ("datetime", True),
+            ("counter", False),
+            ("typeofmeasurement", False),
+            ("vehicletype", False),
+            ("direction", False),
+        ],
+        "include": ["phenomenondurationseconds", "unit", "value", "source"],
+    },
+    # Observations and aggregates of a counter within a datetime range. The
+    # type of measurement is matched case-insensitively, so it is checked
+    # from the index entries rather than used as a key.
+    "counter": {
+        "method": "btree",
+        "keys": [("counter", False), ("datetime", False)],
+        "include": ["typeofmeasurement", "direction", "unit", "value"],
+    },
+    # Datetime ranges over all counters, compact for append-mostly tables
+    "datetime": {
+        "method": "brin",
+        "keys": [("datetime", False)],
+        "include": [],
+    },
+}
+
+
+def satisfies(index, spec) -> bool:
+    """
+    Tells whether an existing index serves the query shape of a spec. A
+    B-tree index scanned backwards serves the reversed directions, and may
+    have further key columns after those of the spec.
+    """
+    method, columns, descending, included = index
+    if method != spec["method"]:
+        return False
+    keys = list(zip(columns, descending))
+    spec_keys = spec["keys"]
+    reversed_keys = [(column, not desc) for column, desc in spec_keys]
+    if method == "btree":
+        if keys[: len(spec_keys)] not in (spec_keys, reversed_keys):
+            return False
+    elif [column for column, _ in keys[:1]] != [spec_keys[0][0]]:
+        return False
+    return set(spec["include"]) <= set(columns) | set(included)
+
+
+def get_create_statement(schema, table, name, spec) -> str:
+    keys = sql.SQL(", ").join(
+        sql.SQL("{column}{order}").format(
+            column=sql.Identifier(column), order=sql.SQL(" DESC" if desc else "")
+        )
+        for column, desc in spec["keys"]
+    )
+    include = sql.SQL(", ").join(sql.Identifier(column) for column in spec["include"])
+    statement = sql.SQL(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} "
+        "USING {method} ({keys})"
+    ).format(
+        name=sql.Identifier(name),
+        table=sql.Identifier(schema, table),
+        method=sql.SQL(spec["method"]),
+        keys=keys,
+    )
+    if spec["include"]:
+        statement += sql.SQL(" INCLUDE ({include})").format(include=include)
+    return statement.as_string(connection.connection)
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifies, and with --create creates, the indexes of the tables behind "
+        "lido.vw_observations for the query shapes of the observation endpoints, "
+        "and prints the EXPLAIN plans of those queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--create",
+            action="store_true",
+            help="Create the missing indexes concurrently.",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run the queries with EXPLAIN ANALYZE to report actual timings.",
+        )
+        parser.add_argument(
+            "--counter",
+            type=int,
+            help="Counter id of the queries filtered by counter. Defaults to the "
+            "counter with the latest stored observation.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Length of the datetime range of the queries, ending at the "
+            "latest observation of the counter. Defaults to 7.",
+        )
+        parser.add_argument(
+            "--skip-explain",
+            action="store_true",
+            help="Only verify or create the indexes.",
+        )
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute(VIEW_TABLES_QUERY)
+            tables = cursor.fetchall()
+        if not tables:
+            raise CommandError("No tables found behind lido.vw_observations.")
+
+        for schema, table in tables:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{schema}.{table}"))
+            self.handle_table(schema, table, options["create"])
+
+        if not options["skip_explain"]:
+            self.explain(options)
+
+    def handle_table(self, schema, table, create):
+        with connection.cursor() as cursor:
+            cursor.execute(COLUMNS_QUERY, [schema, table])
+            columns = {row[0] for row in cursor.fetchall()}
+            cursor.execute(INDEXES_QUERY, [f"{schema}.{table}"])
+            indexes = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        # The view selects the counter id from one of these columns
+        counter_column = "counter_id" if "counter_id" in columns else "id"
+        for spec_name, spec in INDEX_SPECS.items():
+            spec = {
+                **spec,
+                "keys": [
+                    (counter_column if column == "counter" else column, desc)
+                    for column, desc in spec["keys"]
+                ],
+            }
+            missing_columns = {
+                column for column, _ in spec["keys"] if column not in columns
+            } | (set(spec["include"]) - columns)
+            if missing_columns:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"  {spec_name}: skipped, no column "
+                        f"{', '.join(sorted(missing_columns))}"
+                    )
+                )
+                continue
+
+            matching = [
+                name for name, index in indexes.items() if satisfies(index, spec)
+            ]
+            if matching:
+                self.stdout.write(f"  {spec_name}: served by {', '.join(matching)}")
+                continue
+
+            statement = get_create_statement(
+                schema, table, f"{table}_api_{spec_name}_idx", spec
+            )
+            if not create:
+                self.stdout.write(self.style.WARNING(f"  {spec_name}: missing"))
+                self.stdout.write(f"    {statement}")
+                continue
+            # Concurrent index builds cannot run inside a transaction, the
+            # connection is in autocommit mode here
+            with connection.cursor() as cursor:
+                cursor.execute(statement)
+            self.stdout.write(self.style.SUCCESS(f"  {spec_name}: created"))
+
+    def explain(self, options):
+        if options["counter"] is not None:
+            counter = Counter.objects.filter(pk=options["counter"]).first()
+        else:
+            counter = (
+                Counter.objects.exclude(last_stored_observation=None)
+                .order_by("-last_stored_observation")
+                .first()
+            )
+        if counter is None:
+            raise CommandError("No counter found for the queries.")
+        if counter.last_stored_observation is None:
+            raise CommandError(f"Counter {counter.pk} has no observations.")
+
+        end_date = counter.last_stored_observation.date()
+        parameters = {
+            "counter": str(counter.pk),
+            "start_date": str(end_date - timedelta(days=options["days"])),
+            "end_date": str(end_date),
+        }
+        ordering = ObservationsCursorPagination.ordering
+        page_size = ObservationsCursorPagination.page_size
+        observations = ObservationFilter(
+            parameters, queryset=Observation.objects.all()
+        ).qs
+        aggregates = (
+            ObservationAggregateFilter(
+                {**parameters, "period": "day", "measurement_type": "count"},
+                queryset=Observation.objects.all(),
+            )
+            .qs.annotate(start_time=Trunc("datetime", kind="day"))
+            .values("start_time", "counter_id", "direction", "unit")
+            .annotate(aggregated_value=Sum("value"))
+            .order_by("-start_time")
+        )
+        querysets = {
+            "First page of all observations": Observation.objects.order_by(*ordering)[
+                :page_size
+            ],
+            "First page of the observations of a counter": observations.order_by(
+                *ordering
+            )[:page_size],
+            "Export of the observations of a counter": observations.order_by(
+                "-datetime"
+            ).values_list(*ObservationViewSet.export_fields),
+            "Daily aggregates of a counter": aggregates,
+        }
+        for title, queryset in querysets.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            plan = queryset.explain(
+                analyze=options["analyze"], buffers=options["analyze"]
+            )
+            for line in plan.splitlines():
+                self.stdout.write(f"  {line}")
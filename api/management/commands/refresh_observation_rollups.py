@@ -0,0 +1,129 @@
+from datetime import UTC, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+ROLLUP_NAME = "observations"
+
+CREATE_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS lido.observation_rollup_state (
+        rollup character varying(32) PRIMARY KEY,
+        refreshed_until timestamp with time zone NOT NULL
+    )
+    """,
+    *[
+        statement
+        for table in ("observation_rollup_hourly", "observation_rollup_daily")
+        for statement in (
+            f"""
+            CREATE TABLE IF NOT EXISTS lido.{table} (
+                counter_id bigint NOT NULL,
+                datetime timestamp with time zone NOT NULL,
+                direction character varying(32) NOT NULL,
+                unit character varying(8),
+                typeofmeasurement character varying(32) NOT NULL,
+                value_sum bigint,
+                value_count bigint NOT NULL
+            )
+            """,
+            f"""
+            CREATE INDEX IF NOT EXISTS {table}_counter_idx
+            ON lido.{table} (counter_id, typeofmeasurement, datetime)
+            """,
+        )
+    ],
+]
+
+REFRESH_STATEMENTS = [
+    "DELETE FROM lido.observation_rollup_hourly WHERE datetime >= %(since)s",
+    """
+    INSERT INTO lido.observation_rollup_hourly (
+        counter_id, datetime, direction, unit, typeofmeasurement,
+        value_sum, value_count
+    )
+    SELECT id, date_trunc('hour', datetime, %(tz)s), direction, unit,
+        typeofmeasurement, sum(value), count(value)
+    FROM lido.vw_observations
+    WHERE datetime >= %(since)s AND datetime < %(until)s
+    GROUP BY 1, 2, 3, 4, 5
+    """,
+    # Days are built from the hours, which are already summed
+    "DELETE FROM lido.observation_rollup_daily WHERE datetime >= %(since)s",
+    """
+    INSERT INTO lido.observation_rollup_daily (
+        counter_id, datetime, direction, unit, typeofmeasurement,
+        value_sum, value_count
+    )
+    SELECT counter_id, date_trunc('day', datetime, %(tz)s), direction, unit,
+        typeofmeasurement, sum(value_sum), sum(value_count)
+    FROM lido.observation_rollup_hourly
+    WHERE datetime >= %(since)s
+    GROUP BY 1, 2, 3, 4, 5
+    """,
+    """
+    INSERT INTO lido.observation_rollup_state (rollup, refreshed_until)
+    VALUES (%(rollup)s, %(until)s)
+    ON CONFLICT (rollup) DO UPDATE SET refreshed_until = EXCLUDED.refreshed_until
+    """,
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the hourly and daily observation rollup tables if needed and "
+        "refreshes them incrementally from lido.vw_observations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild the rollups from all observations.",
+        )
+        parser.add_argument(
+            "--overlap-hours",
+            type=int,
+            default=48,
+            help="How far before the previous refresh to recompute, to pick up "
+            "observations that were loaded late. Defaults to 48.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            for statement in CREATE_STATEMENTS:
+                cursor.execute(statement)
+
+            cursor.execute(
+                "SELECT refreshed_until FROM lido.observation_rollup_state "
+                "WHERE rollup = %s",
+                [ROLLUP_NAME],
+            )
+            state = cursor.fetchone()
+            until = timezone.now()
+            if options["full"] or state is None:
+                since = datetime.min.replace(tzinfo=UTC)
+            else:
+                since = state[0] - timedelta(hours=options["overlap_hours"])
+                # Align to a local day so that daily buckets are rebuilt whole
+                since = timezone.make_aware(
+                    datetime.combine(timezone.localdate(since), time.min)
+                )
+
+            params = {
+                "since": since,
+                "until": until,
+                "tz": settings.TIME_ZONE,
+                "rollup": ROLLUP_NAME,
+            }
+            for statement in REFRESH_STATEMENTS:
+                cursor.execute(statement, params)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed observation rollups from {since.isoformat()} "
+                f"until {until.isoformat()}."
+            )
+        )
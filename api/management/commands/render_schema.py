@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from api.schemas import get_schema_path, render_schema
+from api.utils import get_source_choices
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the OpenAPI schema into files served by /schema/, "
+        "see the OPENAPI_SCHEMA_DIR setting. The database must be available "
+        "for the data source enums of the schema."
+    )
+
+    def handle(self, *args, **options):
+        try:
+            get_source_choices()
+        except DatabaseError as error:
+            raise CommandError(
+                f"The data sources of the schema cannot be read: {error}"
+            ) from error
+        Path(settings.OPENAPI_SCHEMA_DIR).mkdir(parents=True, exist_ok=True)
+        for format, content in render_schema().items():
+            path = get_schema_path(format)
+            # Replace the file atomically, it may be served while rendering
+            temporary_path = path.with_suffix(f"{path.suffix}.tmp")
+            temporary_path.write_bytes(content)
+            temporary_path.replace(path)
+            self.stdout.write(self.style.SUCCESS(f"Rendered {path}."))
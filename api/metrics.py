@@ -0,0 +1,108 @@
+"""
+Prometheus metrics of the API, collected by api.middleware.RequestMetricsMiddleware
+and served by `metrics_view` at /metrics.
+
+Each gunicorn worker process writes its metrics to files in
+PROMETHEUS_MULTIPROC_DIR, which /metrics collects from all the workers when
+the variable is set, see docker-entrypoint.sh and gunicorn.conf.py.
+"""
+
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Up to the statement timeout of the observation export
+DURATION_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+# From 1 KiB to 256 MiB in steps of four
+BYTES_BUCKETS = tuple(1024 * 4**exponent for exponent in range(10))
+
+REQUEST_DURATION = Histogram(
+    "lidotiku_request_duration_seconds",
+    "Duration of requests by view and status code.",
+    ["view", "status"],
+    buckets=DURATION_BUCKETS,
+)
+PHASE_DURATION = Histogram(
+    "lidotiku_request_phase_duration_seconds",
+    "Duration of the phases of requests by view, see api.timing.",
+    ["view", "phase"],
+    buckets=DURATION_BUCKETS,
+)
+DB_QUERIES = Counter(
+    "lidotiku_db_queries",
+    "Database queries made by requests by view.",
+    ["view"],
+)
+ROWS = Counter(
+    "lidotiku_rows",
+    "Rows paginated and serialized by view.",
+    ["view"],
+)
+RESPONSE_BYTES = Histogram(
+    "lidotiku_response_bytes",
+    "Size of the response bodies by view, after compression. Streamed "
+    "responses are left out.",
+    ["view"],
+    buckets=BYTES_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "lidotiku_requests_in_flight",
+    "Requests being handled.",
+    multiprocess_mode="livesum",
+)
+
+
+def observe_request(request, response, seconds: float):
+    """
+    Records the metrics of a handled request, including the phases measured
+    by api.middleware.ServerTimingMiddleware when it is enabled.
+    """
+    resolver_match = request.resolver_match
+    view = resolver_match.view_name if resolver_match else "unmatched"
+    REQUEST_DURATION.labels(view, response.status_code).observe(seconds)
+    if not response.streaming:
+        RESPONSE_BYTES.labels(view).observe(len(response.content))
+
+    timing = getattr(request, "timing", None)
+    if timing is None:
+        return
+    for phase, phase_seconds in timing.durations.items():
+        if phase != "total":
+            PHASE_DURATION.labels(view, phase).observe(phase_seconds)
+    DB_QUERIES.labels(view).inc(timing.counts.get("sql_queries", 0))
+    if "rows" in timing.counts:
+        ROWS.labels(view).inc(timing.counts["rows"])
+
+
+def metrics_view(request):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
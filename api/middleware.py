@@ -0,0 +1,102 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware
+
+from .metrics import REQUESTS_IN_FLIGHT, observe_request
+from .timing import measure_request, timed
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records the Prometheus metrics of each request, see api.metrics. Place it
+    before ServerTimingMiddleware to record the phases it measures too.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with REQUESTS_IN_FLIGHT.track_inprogress():
+            response = self.get_response(request)
+        observe_request(request, response, time.perf_counter() - start)
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Measures the phases of each request, see api.timing. The durations are
+    returned in the Server-Timing header, and logged together with the counts
+    of queries, rows and bytes in the logger context of the request. Streamed
+    responses only report the total time until streaming starts. Place it
+    after XRequestIdMiddleware and before TimedGZipMiddleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with (
+            measure_request() as timing,
+            connection.execute_wrapper(timing.execute_wrapper),
+        ):
+            request.timing = timing
+            response = self.get_response(request)
+            timing.finish()
+
+        if response.streaming:
+            # Streamed bodies, and the queries of them, are produced while the
+            # response is sent after these measurements, which would leave the
+            # phases incomplete. Only the time until streaming starts is kept.
+            timing.keep_total()
+        else:
+            timing.counts["response_bytes"] = len(response.content)
+        response["Server-Timing"] = timing.get_server_timing()
+        resolver_match = request.resolver_match
+        logger.info(
+            "Request timing",
+            extra={
+                "method": request.method,
+                "view": resolver_match.view_name if resolver_match else None,
+                "status_code": response.status_code,
+                **timing.get_log_fields(),
+            },
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called between the view and the rendering of its response
+        timing = request.timing
+        render_start = time.perf_counter()
+        timing.add("view", render_start - timing.view_start)
+
+        def measure_render(rendered):
+            timing.add("render", time.perf_counter() - render_start)
+            timing.counts["rendered_bytes"] = len(rendered.content)
+
+        response.add_post_render_callback(measure_render)
+        return response
+
+
+class TimedGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware measuring the compression of responses, see api.timing.
+    Streamed responses are compressed while they are sent, after measuring.
+    """
+
+    def process_response(self, request, response):
+        with timed("gzip"):
+            return super().process_response(request, response)
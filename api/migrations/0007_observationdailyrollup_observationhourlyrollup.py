@@ -0,0 +1,73 @@
+# Generated by Django 5.2.17 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0006_datasource_delete_counterwithlatestobservations_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ObservationDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        db_column="ctid", primary_key=True, serialize=False
+                    ),
+                ),
+                ("datetime", models.DateTimeField()),
+                ("direction", models.CharField(max_length=32)),
+                ("unit", models.CharField(max_length=8)),
+                ("typeofmeasurement", models.CharField(max_length=32)),
+                ("value_sum", models.BigIntegerField()),
+                ("value_count", models.BigIntegerField()),
+                (
+                    "counter",
+                    models.ForeignKey(
+                        db_column="counter_id",
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        related_name="+",
+                        to="api.counter",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": '"lido"."observation_rollup_daily"',
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ObservationHourlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        db_column="ctid", primary_key=True, serialize=False
+                    ),
+                ),
+                ("datetime", models.DateTimeField()),
+                ("direction", models.CharField(max_length=32)),
+                ("unit", models.CharField(max_length=8)),
+                ("typeofmeasurement", models.CharField(max_length=32)),
+                ("value_sum", models.BigIntegerField()),
+                ("value_count", models.BigIntegerField()),
+                (
+                    "counter",
+                    models.ForeignKey(
+                        db_column="counter_id",
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        related_name="+",
+                        to="api.counter",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": '"lido"."observation_rollup_hourly"',
+                "managed": False,
+            },
+        ),
+    ]
@@ -82,3 +82,43 @@ class Datasource(ReadOnlyModel):
     description_sv = models.CharField(max_length=255)
     description_en = models.CharField(max_length=255)
     license = models.CharField(max_length=32)
+
+
+class ObservationRollup(ReadOnlyModel):
+    """
+    Observation values pre-summed per counter, direction, unit and type of
+    measurement over a fixed bucket. Maintained by the
+    `refresh_observation_rollups` management command.
+    """
+
+    class Meta:
+        abstract = True
+
+    id = models.CharField(primary_key=True, db_column="ctid")
+    counter = models.ForeignKey(
+        Counter, db_column="counter_id", on_delete=models.RESTRICT, related_name="+"
+    )
+    # Start of the bucket
+    datetime = models.DateTimeField()
+    direction = models.CharField(max_length=32)
+    unit = models.CharField(max_length=8)
+    typeofmeasurement = models.CharField(max_length=32)
+    value_sum = models.BigIntegerField()
+    # Number of non-null values, used for averaging
+    value_count = models.BigIntegerField()
+
+
+class ObservationHourlyRollup(ObservationRollup):
+    """Database Table"""
+
+    class Meta:
+        managed = False
+        db_table = '"lido"."observation_rollup_hourly"'
+
+
+class ObservationDailyRollup(ObservationRollup):
+    """Database Table"""
+
+    class Meta:
+        managed = False
+        db_table = '"lido"."observation_rollup_daily"'
@@ -1,12 +1,18 @@
-import operator
-from functools import reduce
+from datetime import UTC, datetime, timedelta
 
+from django.core.paginator import EmptyPage, Page
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import BooleanField, DateTimeField, F, Value
+from django.db.models.expressions import Expression
+from django.db.models.functions import Coalesce
 from django.db.models.query import Q
+from django.utils.functional import cached_property
 from rest_framework.pagination import (
     CursorPagination,
     PageNumberPagination,
     _reverse_ordering,
 )
+from rest_framework.response import Response
 from rest_framework.utils import json
 from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework.views import APIView
@@ -14,11 +20,102 @@ from rest_framework.views import APIView
 from .utils import counter_alias_map
 
 
+def check_page_cost(view, queryset):
+    """
+    Lets the view reject the query of a page before it runs, with the offset
+    or cursor position the page is read with, see QueryLimitMixin.
+    """
+    check_query_cost = getattr(view, "check_query_cost", None)
+    if check_query_cost is not None:
+        check_query_cost(queryset)
+
+
+class EstimatedCountPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Paginator which avoids counting every row of a large result set.
+
+    Rows are counted exactly up to `count_threshold`, above which the query
+    planner's row estimate is used instead, unless `count_exact` is set.
+    Pages fetch one extra row to tell whether a following page exists, so
+    the links do not depend on the count.
+    """
+
+    def __init__(
+        self, object_list, per_page, count_threshold, count_exact=False, **kwargs
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_threshold = count_threshold
+        self.count_exact = count_exact
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        if self.count_exact:
+            return super().count
+        queryset = self.object_list.order_by()
+        capped_count = queryset[: self.count_threshold + 1].count()
+        if capped_count <= self.count_threshold:
+            return capped_count
+        self.count_is_exact = False
+        return max(self._get_estimated_count(queryset), capped_count)
+
+    @staticmethod
+    def _get_estimated_count(queryset) -> int:
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Past an estimated last page the fetched rows tell if the page exists
+            if self.count_is_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_is_exact:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        results = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not results and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        object_list = results[: self.per_page]
+        self.count = max(self.count, bottom + len(results))
+        return EstimatedCountPage(
+            object_list, number, self, has_next=len(results) > len(object_list)
+        )
+
+
 class LargeResultsSetPagination(PageNumberPagination):
     page_size = 1000
     page_size_query_param = "page_size"
     max_page_size = 10000
 
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if page_size:
+            try:
+                number = max(int(request.query_params.get(self.page_query_param, 1)), 1)
+            except ValueError:
+                # Invalid page numbers are rejected by the paginator, and the
+                # last page is estimated like the first one
+                number = 1
+            bottom = (number - 1) * page_size
+            check_page_cost(view, queryset[bottom : bottom + page_size + 1])
+        return super().paginate_queryset(queryset, request, view)
+
     def get_previous_link(self) -> str | None:
         previous_link = super().get_previous_link()
         if not self.page.has_previous():
@@ -43,10 +140,97 @@ class SmallResultsSetPagination(PageNumberPagination):
     max_page_size = 1000
 
 
+class ObservationsPageNumberPagination(LargeResultsSetPagination):
+    count_exact_query_param = "count_exact"
+    # Result sets larger than this report the planner's row estimate as count
+    count_threshold = 50000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_exact = (
+            request.query_params.get(self.count_exact_query_param, "").lower() == "true"
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return EstimatedCountPaginator(
+            object_list,
+            per_page,
+            count_threshold=self.count_threshold,
+            count_exact=self.count_exact,
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_is_estimate": not self.page.paginator.count_is_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        paginated_schema = super().get_paginated_response_schema(schema)
+        paginated_schema["properties"]["countIsEstimate"] = {
+            "type": "boolean",
+            "description": "Whether the count is the query planner's row estimate "
+            "of a large result set instead of an exact count.",
+            "example": False,
+        }
+        paginated_schema["required"].append("countIsEstimate")
+        return paginated_schema
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+class RowComparison(Expression):
+    """
+    Compares a row of expressions to a row of values, e.g.
+    `(datetime, counter_id) < (%s, %s)`.
+    """
+
+    output_field = BooleanField()
+
+    def __init__(self, expressions, operator, values):
+        super().__init__()
+        self.operator = operator
+        self.fields = list(expressions)
+        self.values = list(values)
+
+    def get_source_expressions(self):
+        return [*self.fields, *self.values]
+
+    def set_source_expressions(self, exprs):
+        self.fields = exprs[: len(self.fields)]
+        self.values = exprs[len(self.fields) :]
+
+    def as_sql(self, compiler, connection):
+        fields_sql, fields_params = self._compile_row(compiler, self.fields)
+        values_sql, values_params = self._compile_row(compiler, self.values)
+        return (
+            f"({fields_sql}) {self.operator} ({values_sql})",
+            (*fields_params, *values_params),
+        )
+
+    @staticmethod
+    def _compile_row(compiler, expressions):
+        sqls, params = [], []
+        for expression in expressions:
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        return ", ".join(sqls), params
+
+
 ## Code from https://github.com/sonthonaxrk/django-rest-framework/blob/29d8796b1d96cbe77ecd81663ee7afbace0229e0/rest_framework/pagination.py
 ## Utilizes all ordering fields to determine position instead of
 # just the first field in the ordering list.
 class CompoundCursorPagination(CursorPagination):
+    # Ordering fields which may be NULL, compared and sorted as empty strings
+    nullable_fields: tuple[str, ...] = ()
+
     def paginate_queryset(self, queryset, request, view=None):
         self.page_size = self.get_page_size(request)
         if not self.page_size:
@@ -63,50 +247,24 @@ class CompoundCursorPagination(CursorPagination):
 
         # Cursor pagination always enforces an ordering.
         if reverse:
-            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+            queryset = queryset.order_by(
+                *self._get_order_by(_reverse_ordering(self.ordering))
+            )
         else:
-            queryset = queryset.order_by(*self.ordering)
+            queryset = queryset.order_by(*self._get_order_by(self.ordering))
 
         # If we have a cursor with a fixed position then filter by that.
         if current_position is not None:
-            current_position_list = json.loads(current_position)
-
-            q_objects_equals = {}
-            q_objects_compare = {}
-
-            for order, position in zip(self.ordering, current_position_list):
-                is_reversed = order.startswith("-")
-                order_attr = order.lstrip("-")
-
-                q_objects_equals[order] = Q(**{order_attr: position})
-
-                # Test for: (cursor reversed) XOR (queryset reversed)
-                if self.cursor.reverse != is_reversed:
-                    q_objects_compare[order] = Q(**{(order_attr + "__lt"): position})
-                else:
-                    q_objects_compare[order] = Q(**{(order_attr + "__gt"): position})
-
-            filter_list = [q_objects_compare[self.ordering[0]]]
-
-            ordering = self.ordering
-
-            # starting with the second field
-            for i in range(len(ordering)):
-                # The first operands need to be equals
-                # the last operands need to be gt
-                equals = list(ordering[: i + 2])
-                greater_than_q = q_objects_compare[equals.pop()]
-                sub_filters = [q_objects_equals[e] for e in equals]
-                sub_filters.append(greater_than_q)
-                filter_list.append(reduce(operator.and_, sub_filters))
-
-            q_object = reduce(operator.or_, filter_list)
-            queryset = queryset.filter(q_object)
+            queryset = queryset.filter(
+                self._get_position_filter(queryset, current_position)
+            )
 
         # If we have an offset cursor then offset the entire page by that amount.
         # We also always fetch an extra item in order to determine if there is a
         # page following on from this one.
-        results = list(queryset[offset : offset + self.page_size + 1])
+        page_queryset = queryset[offset : offset + self.page_size + 1]
+        check_page_cost(view, page_queryset)
+        results = list(page_queryset)
         self.page = list(results[: self.page_size])
 
         # Determine the position of the final item following the page.
@@ -191,6 +349,104 @@ class CompoundCursorPagination(CursorPagination):
             ordering = (ordering,)
         return tuple(ordering)
 
+    def _get_order_by(self, ordering):
+        order_by = []
+        for order in ordering:
+            name = order.lstrip("-")
+            if name not in self.nullable_fields:
+                order_by.append(order)
+            elif order.startswith("-"):
+                order_by.append(self._coalesce(F(name)).desc())
+            else:
+                order_by.append(self._coalesce(F(name)).asc())
+        return order_by
+
+    @staticmethod
+    def _coalesce(expression):
+        # A NULL makes a row comparison NULL, so that the rows with one would
+        # never follow a position. NULL is compared and sorted as "" instead.
+        return Coalesce(expression, Value(""))
+
+    def _get_position_row(self, fields, values):
+        """
+        Returns the expressions and values of the fields of a position, with
+        the fields of `nullable_fields` coalesced like in the ordering.
+        """
+        expressions, value_expressions = [], []
+        for field, value in zip(fields, values):
+            if field.name in self.nullable_fields:
+                expressions.append(self._coalesce(F(field.attname)))
+                value_expressions.append(
+                    Value("" if value is None else value, output_field=field)
+                )
+            else:
+                expressions.append(F(field.attname))
+                value_expressions.append(Value(value, output_field=field))
+        return expressions, value_expressions
+
+    def _get_position_filter(self, queryset, current_position):
+        """
+        Returns a condition selecting the rows after the given position.
+
+        Consecutive ordering fields compared in the same direction are
+        combined into a single row value comparison, e.g. for the ordering
+        `-datetime, counter_id, direction`:
+
+            datetime <= %s AND (
+                datetime < %s OR (datetime = %s AND (counter_id, direction) > (%s, %s))
+            )
+
+        The leading bound lets the database do a single index range scan.
+        """
+        model_fields = [
+            queryset.model._meta.get_field(order.lstrip("-")) for order in self.ordering
+        ]
+        position = [
+            self._decode_position_value(field, value)
+            for field, value in zip(model_fields, json.loads(current_position))
+        ]
+
+        # Group the fields into runs compared with the same operator,
+        # test for: (cursor reversed) XOR (queryset reversed)
+        runs: list[tuple[str, list, list]] = []
+        for order, field, value in zip(self.ordering, model_fields, position):
+            operator = "<" if self.cursor.reverse != order.startswith("-") else ">"
+            if runs and runs[-1][0] == operator:
+                runs[-1][1].append(field)
+                runs[-1][2].append(value)
+            else:
+                runs.append((operator, [field], [value]))
+
+        condition = None
+        for operator, fields, values in reversed(runs):
+            expressions, value_expressions = self._get_position_row(fields, values)
+            compare = Q(RowComparison(expressions, operator, value_expressions))
+            if condition is None:
+                condition = compare
+            else:
+                equals = Q(RowComparison(expressions, "=", value_expressions))
+                condition = compare | (equals & condition)
+
+        first_operator, first_fields, first_values = runs[0]
+        expressions, value_expressions = self._get_position_row(
+            first_fields[:1], first_values[:1]
+        )
+        leading_bound = Q(
+            RowComparison(expressions, f"{first_operator}=", value_expressions)
+        )
+        return leading_bound & condition
+
+    def _decode_position_value(self, field, value):
+        if isinstance(field, DateTimeField) and isinstance(value, int):
+            return EPOCH + timedelta(microseconds=value)
+        # Also parses positions of cursors encoded as strings
+        return field.to_python(value)
+
+    def _encode_position_value(self, value):
+        if isinstance(value, datetime):
+            return (value - EPOCH) // timedelta(microseconds=1)
+        return value
+
     def _get_position_from_instance(self, instance, ordering):
         fields = []
 
@@ -201,8 +457,8 @@ class CompoundCursorPagination(CursorPagination):
             else:
                 attr = getattr(instance, field_name)
 
-            fields.append(str(attr))
-        return json.dumps(fields)
+            fields.append(self._encode_position_value(attr))
+        return json.dumps(fields, separators=(",", ":"))
 
 
 class ObservationsCursorPagination(CompoundCursorPagination):
@@ -215,6 +471,8 @@ class ObservationsCursorPagination(CompoundCursorPagination):
         "vehicletype",
         "direction",
     ]
+    # Not constrained NOT NULL by lido.vw_observations
+    nullable_fields = ("typeofmeasurement", "vehicletype", "direction")
     max_page_size = 10000
 
     def get_schema_operation_parameters(self, view: APIView) -> list:
@@ -231,9 +489,28 @@ class ObservationsCursorPagination(CompoundCursorPagination):
             "schema": {"type": "integer"},
         }
 
-        parameters.append(page_parameter)
+        count_exact_parameter = {
+            "name": "count_exact",
+            "required": False,
+            "in": "query",
+            "description": "Used with the page parameter. Large result sets "
+            "report an estimated count unless this is set to true.",
+            "schema": {"type": "boolean"},
+        }
+
+        parameters.extend([page_parameter, count_exact_parameter])
         return parameters
 
+    def get_paginated_response_schema(self, schema):
+        paginated_schema = super().get_paginated_response_schema(schema)
+        # Pages requested with the page parameter also report the count
+        properties = ObservationsPageNumberPagination().get_paginated_response_schema(
+            schema
+        )["properties"]
+        for name in ("count", "countIsEstimate"):
+            paginated_schema["properties"][name] = properties[name]
+        return paginated_schema
+
     def get_ordering(self, request, queryset, view):
         ordering = super().get_ordering(request, queryset, view)
         if "order" in request.query_params:
@@ -0,0 +1,58 @@
+from contextlib import contextmanager, suppress
+
+from django.db import DatabaseError, OperationalError, connection
+from rest_framework.exceptions import APIException
+from rest_framework.utils import json
+
+# SQLSTATE of a statement canceled by statement_timeout
+QUERY_CANCELED = "57014"
+
+
+class QueryTimeout(APIException):
+    status_code = 503
+    default_detail = "The query took too long to run."
+    default_code = "query_timeout"
+
+
+class QueryCostExceeded(APIException):
+    status_code = 400
+    default_detail = "The query would take too long to run."
+    default_code = "query_cost_exceeded"
+
+
+def is_query_canceled(exc: Exception) -> bool:
+    return (
+        isinstance(exc, OperationalError)
+        and getattr(exc.__cause__, "sqlstate", None) == QUERY_CANCELED
+    )
+
+
+@contextmanager
+def statement_timeout(seconds: float | None):
+    """
+    Cancels the queries run within the block after the given number of
+    seconds. The setting lasts for the session, so that queries of streamed
+    responses declared within the block are bounded too, and is reset when
+    the block exits.
+    """
+    if not seconds:
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('statement_timeout', %s, false)",
+            [f"{max(1, round(seconds * 1000))}ms"],
+        )
+    try:
+        yield
+    finally:
+        # A broken connection is discarded rather than reused
+        with suppress(DatabaseError), connection.cursor() as cursor:
+            cursor.execute("RESET statement_timeout")
+
+
+def get_query_cost(queryset) -> float:
+    """Returns the planner's estimated total cost of the query."""
+    plan = json.loads(queryset.explain(format="json"))
+    return float(plan[0]["Plan"]["Total Cost"])
@@ -1,10 +1,341 @@
+import csv
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+from functools import lru_cache
+from io import StringIO
+from itertools import islice
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from djangorestframework_camel_case.util import (
+    camelize_re,
+    is_iterable,
+    underscore_to_camel,
+)
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.serializer_helpers import ReturnDict
+from rest_framework_csv.misc import Echo
 from rest_framework_csv.renderers import PaginatedCSVRenderer
 
+from .timing import timed
+
+
+class CSVTable:
+    """Rows of a CSV response with fixed columns, see FixedColumnsCSVRenderer."""
+
+    def __init__(self, header: Sequence[str], rows: Iterable[Sequence]):
+        self.header = header
+        self.rows = rows
+
+
+class FixedColumnsCSVRenderer(PaginatedCSVRenderer):
+    """
+    Writes a CSVTable row by row with the csv module, without flattening the
+    rows into dicts or collecting the header from them. Other data, such as
+    errors, is rendered by PaginatedCSVRenderer.
+    """
+
+    def render(self, data, media_type=None, renderer_context=None):
+        if not isinstance(data, CSVTable):
+            return super().render(data, media_type, renderer_context or {})
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(data.header)
+        writer.writerows(data.rows)
+        return buffer.getvalue().encode(settings.DEFAULT_CHARSET)
+
 
-class FeaturesPaginatedCSVRenderer(PaginatedCSVRenderer):
+class FeaturesPaginatedCSVRenderer(FixedColumnsCSVRenderer):
     def render(self, data, media_type=None, renderer_context=None):
         try:
             data = data["results"]["features"]
         except (KeyError, TypeError):
             pass
         return super().render(data, media_type, renderer_context)
+
+
+# Values returned as is by camelize
+SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+@lru_cache(maxsize=4096)
+def camelize_key(key: str) -> str:
+    """Converts a snake_case key like djangorestframework_camel_case does."""
+    if "_" not in key:
+        return key
+    return camelize_re.sub(underscore_to_camel, key)
+
+
+def camelize(data):
+    """
+    Returns the same data as `djangorestframework_camel_case.util.camelize`
+    without options, but converts each distinct key only once per process
+    and passes scalar values through without inspecting them further.
+    """
+    if type(data) in SCALAR_TYPES:
+        return data
+    if isinstance(data, dict):
+        if isinstance(data, ReturnDict):
+            new_dict = ReturnDict(serializer=data.serializer)
+        else:
+            new_dict = {}
+        for key, value in data.items():
+            if isinstance(key, Promise):
+                key = force_str(key)
+            if isinstance(key, str):
+                key = camelize_key(key)
+            new_dict[key] = value if type(value) in SCALAR_TYPES else camelize(value)
+        return new_dict
+    if isinstance(data, Promise):
+        return force_str(data)
+    if isinstance(data, str) or not is_iterable(data):
+        return data
+    return [camelize(item) for item in data]
+
+
+class FastCamelCaseJSONRenderer(CamelCaseJSONRenderer):
+    """
+    Renders the same JSON as CamelCaseJSONRenderer with less work per key,
+    see `camelize`. The ignore_fields and ignore_keys options of
+    JSON_CAMEL_CASE are not supported.
+    """
+
+    def render(self, data, *args, **kwargs):
+        with timed("camelize"):
+            data = camelize(data)
+        return super(CamelCaseJSONRenderer, self).render(data, *args, **kwargs)
+
+
+class ORJSONCamelCaseRenderer(FastCamelCaseJSONRenderer):
+    """
+    Renders camelCase JSON with orjson, which encodes datetimes natively.
+    Other types, such as Decimals, are converted like the JSON encoder of
+    REST framework does. Indented output for the browsable API, and data
+    orjson cannot encode, e.g. integers over 64 bits, are rendered with the
+    json module.
+
+    The output equals that of CamelCaseJSONRenderer byte for byte, except for
+    floats: orjson writes exponents without a plus sign or zero padding, e.g.
+    `1e20` and `1e-7` for `1e+20` and `1e-07`, and NaN and infinities as
+    null, which the strict JSON of REST framework rejects with an error.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        with timed("camelize"):
+            camelized = camelize(data)
+        try:
+            content = orjson.dumps(
+                camelized,
+                default=self.encoder_class().default,
+                option=self.options,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by REST framework for JavaScript, see JSONRenderer.render
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return content
+
+
+class EncodedPassthroughRenderer(FastCamelCaseJSONRenderer):
+    """
+    Passes through content already encoded by the database. Other data, such
+    as error responses, is rendered as camelCase JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode()
+        if isinstance(data, bytes):
+            return data
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class GeoJSONRenderer(EncodedPassthroughRenderer):
+    """
+    Renders GeoJSON encoded by the database, e.g. by
+    `CounterFeatureSerializer.get_feature_collection`.
+    """
+
+    media_type = "application/geo+json"
+    format = "geojson"
+
+
+class MVTRenderer(EncodedPassthroughRenderer):
+    """Renders Mapbox Vector Tiles encoded by the database with ST_AsMVT."""
+
+    media_type = "application/vnd.mapbox-vector-tile"
+    format = "mvt"
+
+
+# Type of low-cardinality text columns in the columnar formats, which stores
+# each distinct value once per batch
+DICTIONARY_STRING = pa.dictionary(pa.int32(), pa.string())
+
+
+class ArrowTable:
+    """Rows of a columnar response, see ParquetRenderer and ArrowRenderer."""
+
+    def __init__(self, schema: pa.Schema, rows: Iterable[Sequence]):
+        self.schema = schema
+        self.rows = rows
+
+
+class ArrowTableRenderer(FastCamelCaseJSONRenderer, ABC):
+    """
+    Base of the columnar renderers. Writes an ArrowTable with `stream`, other
+    data, such as error responses, is rendered as camelCase JSON.
+    """
+
+    # File name extension of the format in Content-Disposition
+    extension = ""
+
+    @staticmethod
+    @abstractmethod
+    def stream(schema: pa.Schema, rows: Iterable[Sequence]) -> Iterator[bytes]:
+        """Yields the rows in the format, see StreamingHttpResponse."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, ArrowTable):
+            return b"".join(self.stream(data.schema, data.rows))
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class ParquetRenderer(ArrowTableRenderer):
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
+    extension = "parquet"
+
+    @staticmethod
+    def stream(schema, rows):
+        return stream_parquet(schema, rows)
+
+
+class ArrowRenderer(ArrowTableRenderer):
+    """Renders the Arrow IPC streaming format."""
+
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+    extension = "arrows"
+
+    @staticmethod
+    def stream(schema, rows):
+        return stream_arrow(schema, rows)
+
+
+class _WrittenChunks:
+    """
+    Write-only file for the pyarrow writers, from which the bytes written so
+    far are taken with `take`. The position keeps counting across takes, as
+    the Parquet writer records the file offsets of its row groups.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def record_batches(
+    schema: pa.Schema, rows: Iterable[Sequence], batch_size: int = 65536
+) -> Iterator[pa.RecordBatch]:
+    """
+    Converts rows into record batches of the schema, building each batch
+    column by column from up to `batch_size` rows.
+    """
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        columns = zip(*batch)
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(column, type=field.type)
+                for column, field in zip(columns, schema)
+            ],
+            schema=schema,
+        )
+
+
+def stream_parquet(schema: pa.Schema, rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    Yields a Parquet file one row group at a time, so that the whole file is
+    never held in memory. Intended for `StreamingHttpResponse`.
+    """
+    sink = _WrittenChunks()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in record_batches(schema, rows):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def stream_arrow(schema: pa.Schema, rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    Yields an Arrow IPC stream one record batch at a time. Dictionaries are
+    written again for each batch, which the streaming format allows.
+    Intended for `StreamingHttpResponse`.
+    """
+    sink = _WrittenChunks()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+        yield sink.take()
+        for batch in record_batches(schema, rows):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def stream_csv(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    Yields a CSV document line by line, so that the whole document is never
+    held in memory. Intended for `StreamingHttpResponse`.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(header).encode()
+    for row in rows:
+        yield writer.writerow(row).encode()
+
+
+def stream_json(keys: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """
+    Yields a JSON array of objects, one object per row, with the given keys.
+    Intended for `StreamingHttpResponse`.
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    yield b"["
+    separator = b""
+    for row in rows:
+        yield separator + encoder.encode(dict(zip(keys, row))).encode()
+        separator = b","
+    yield b"]"
@@ -0,0 +1,48 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.http import quote_etag
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+# Renderers of the schema files by the format requested from the schema view
+SCHEMA_RENDERERS = {
+    "yaml": OpenApiYamlRenderer,
+    "json": OpenApiJsonRenderer,
+}
+
+
+def get_schema_path(format: str) -> Path:
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f"openapi-schema.{format}"
+
+
+def render_schema() -> dict[str, bytes]:
+    """Generates the public schema and renders it in every file format."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(
+        request=None, public=spectacular_settings.SERVE_PUBLIC
+    )
+    return {
+        format: renderer().render(schema, renderer_context={})
+        for format, renderer in SCHEMA_RENDERERS.items()
+    }
+
+
+def read_schema(format: str) -> tuple[bytes, str, float]:
+    """
+    Returns the content, ETag and modification time of a rendered schema
+    file. Raises FileNotFoundError if the schema has not been rendered.
+    """
+    path = get_schema_path(format)
+    modified = path.stat().st_mtime
+    content, etag = _read_schema_file(path, modified)
+    return content, etag, modified
+
+
+@lru_cache(maxsize=len(SCHEMA_RENDERERS))
+def _read_schema_file(path: Path, modified: float) -> tuple[bytes, str]:
+    # Keyed by the modification time, so a re-rendered file is read again
+    content = path.read_bytes()
+    return content, quote_etag(hashlib.sha256(content).hexdigest())
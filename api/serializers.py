@@ -1,10 +1,33 @@
+from django.conf import settings
 from django.contrib.gis.measure import Distance
-from django.core.exceptions import ValidationError
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db import connections, transaction
+from django.db.models import FloatField, Func
+from django.utils.functional import cached_property
 from drf_spectacular.utils import OpenApiExample, extend_schema_serializer
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
 from .models import Counter, Datasource, Observation
 
+# Shared by the serializers which format datetimes outside of declared fields
+datetime_field = serializers.DateTimeField()
+
+COUNTER_URL_PLACEHOLDER = "counter-id-placeholder"
+
+
+def get_counter_url_builder(request):
+    """
+    Returns a function which builds the URL of a counter by its id, like the
+    hyperlinked `counter` field of ObservationSerializer, without reversing
+    the URL for every row.
+    """
+    url = reverse(
+        "counter-detail", kwargs={"pk": COUNTER_URL_PLACEHOLDER}, request=request
+    )
+    prefix, suffix = url.split(COUNTER_URL_PLACEHOLDER)
+    return lambda counter_id: f"{prefix}{counter_id}{suffix}"
+
 
 # pylint: disable=abstract-method,too-few-public-methods
 class ReadOnlySerializer(serializers.Serializer):
@@ -67,7 +90,6 @@ class CounterSerializer(serializers.HyperlinkedModelSerializer, ReadOnlySerializ
         return {"type": "Point", "coordinates": [obj.geom.x, obj.geom.y]}
 
     def get_properties(self, obj):
-        datetime_serializer = serializers.DateTimeField()
         return {
             "id": obj.id,
             "name": obj.name,
@@ -79,10 +101,10 @@ class CounterSerializer(serializers.HyperlinkedModelSerializer, ReadOnlySerializ
             # but correct format includes a leading zero
             "municipality_code": f"0{obj.municipality_code}",
             "data_received": obj.data_received,
-            "first_stored_observation": datetime_serializer.to_representation(
+            "first_stored_observation": datetime_field.to_representation(
                 obj.first_stored_observation
             ),
-            "last_stored_observation": datetime_serializer.to_representation(
+            "last_stored_observation": datetime_field.to_representation(
                 obj.last_stored_observation
             ),
         }
@@ -92,6 +114,187 @@ class CounterSerializer(serializers.HyperlinkedModelSerializer, ReadOnlySerializ
         return data
 
 
+class CounterFeatureSerializer:
+    """
+    Serializes counters to the same GeoJSON features as CounterSerializer,
+    but from the rows of `get_rows` instead of model instances. The point
+    coordinates are read with ST_X and ST_Y in the query.
+    """
+
+    row_fields = (
+        "id",
+        "name",
+        "source",
+        "source_id",
+        "classifying",
+        "crs_epsg",
+        "municipality_code",
+        "data_received",
+        "first_stored_observation",
+        "last_stored_observation",
+    )
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def get_rows(cls, queryset):
+        return queryset.annotate(
+            geom_x=Func("geom", function="ST_X", output_field=FloatField()),
+            geom_y=Func("geom", function="ST_Y", output_field=FloatField()),
+        ).values_list(*cls.row_fields, "geom_x", "geom_y")
+
+    @staticmethod
+    def to_representation(row):
+        (
+            counter_id,
+            name,
+            source,
+            source_id,
+            classifying,
+            crs_epsg,
+            municipality_code,
+            data_received,
+            first_stored_observation,
+            last_stored_observation,
+            x,
+            y,
+        ) = row
+        return {
+            "type": "Feature",
+            "id": counter_id,
+            "geometry": {"type": "Point", "coordinates": [x, y]},
+            "properties": {
+                "id": counter_id,
+                "name": name,
+                "source": source,
+                "source_id": source_id,
+                "classifying": classifying,
+                "crs_epsg": crs_epsg,
+                "municipality_code": f"0{municipality_code}",
+                "data_received": data_received,
+                "first_stored_observation": datetime_field.to_representation(
+                    first_stored_observation
+                ),
+                "last_stored_observation": datetime_field.to_representation(
+                    last_stored_observation
+                ),
+            },
+        }
+
+    @cached_property
+    def data(self):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in self.rows]
+
+    # Columns of the flattened features in CSV, sorted like PaginatedCSVRenderer
+    csv_header = (
+        "geometry.coordinates.0",
+        "geometry.coordinates.1",
+        "geometry.type",
+        "id",
+        "properties.classifying",
+        "properties.crs_epsg",
+        "properties.data_received",
+        "properties.first_stored_observation",
+        "properties.id",
+        "properties.last_stored_observation",
+        "properties.municipality_code",
+        "properties.name",
+        "properties.source",
+        "properties.source_id",
+        "type",
+    )
+
+    @staticmethod
+    def to_csv_row(row):
+        (
+            counter_id,
+            name,
+            source,
+            source_id,
+            classifying,
+            crs_epsg,
+            municipality_code,
+            data_received,
+            first_stored_observation,
+            last_stored_observation,
+            x,
+            y,
+        ) = row
+        return (
+            x,
+            y,
+            "Point",
+            counter_id,
+            classifying,
+            crs_epsg,
+            data_received,
+            datetime_field.to_representation(first_stored_observation),
+            counter_id,
+            datetime_field.to_representation(last_stored_observation),
+            f"0{municipality_code}",
+            name,
+            source,
+            source_id,
+            "Feature",
+        )
+
+    @cached_property
+    def csv_rows(self):
+        to_csv_row = self.to_csv_row
+        return [to_csv_row(row) for row in self.rows]
+
+    feature_collection_sql = """
+        SELECT json_build_object(
+            'type', 'FeatureCollection',
+            'features', coalesce(json_agg(json_build_object(
+                'type', 'Feature',
+                'id', counters.id,
+                'geometry', json_build_object(
+                    'type', 'Point',
+                    'coordinates', json_build_array(counters.geom_x, counters.geom_y)
+                ),
+                'properties', json_build_object(
+                    'id', counters.id,
+                    'name', counters.name,
+                    'source', counters.source,
+                    'sourceId', counters.source_id,
+                    'classifying', counters.classifying,
+                    'crsEpsg', counters.crs_epsg,
+                    'municipalityCode', '0' || counters.municipality_code,
+                    'dataReceived', counters.data_received,
+                    'firstStoredObservation', counters.first_stored_observation,
+                    'lastStoredObservation', counters.last_stored_observation
+                )
+            )), '[]')
+        )::text
+        FROM ({rows}) AS counters
+    """
+
+    @classmethod
+    def get_feature_collection(cls, queryset) -> str:
+        """
+        Returns the counters of the queryset as an encoded GeoJSON
+        FeatureCollection with camelCase property names, built by PostGIS.
+        """
+        try:
+            sql, params = cls.get_rows(queryset).query.sql_with_params()
+        except EmptyResultSet:
+            return '{"type": "FeatureCollection", "features": []}'
+
+        with (
+            transaction.atomic(using=queryset.db),
+            connections[queryset.db].cursor() as cursor,
+        ):
+            # Format timestamps in the API's time zone, like DateTimeField
+            cursor.execute(
+                "SELECT set_config('TimeZone', %s, true)", [settings.TIME_ZONE]
+            )
+            cursor.execute(cls.feature_collection_sql.format(rows=sql), params)
+            return cursor.fetchone()[0]
+
+
 class CounterDistanceSerializer(CounterSerializer):
     distance = serializers.SerializerMethodField()
     properties = serializers.SerializerMethodField()
@@ -189,6 +392,115 @@ class ObservationSerializer(serializers.HyperlinkedModelSerializer, ReadOnlySeri
         ]
 
 
+class ObservationRowSerializer:
+    """
+    Serializes observations to the same data as ObservationSerializer, but
+    from the rows of `get_rows` instead of model instances. Counter URLs are
+    formatted from a URL reversed once, and each distinct datetime of the
+    rows is converted once. Without `hyperlinks` the `counter` URL is left
+    out.
+    """
+
+    row_fields = (
+        "typeofmeasurement",
+        "phenomenondurationseconds",
+        "vehicletype",
+        "direction",
+        "unit",
+        "value",
+        "datetime",
+        "source",
+        "counter_id",
+    )
+
+    def __init__(self, rows, request, hyperlinks=True):
+        self.rows = rows
+        self.counter_url = get_counter_url_builder(request) if hyperlinks else None
+
+    @classmethod
+    def get_rows(cls, queryset):
+        # Named rows are tuples without an instance dict, and expose the
+        # ordering fields to the cursor pagination
+        return queryset.values_list(*cls.row_fields, named=True)
+
+    def get_datetimes(self):
+        return {
+            value: datetime_field.to_representation(value)
+            for value in {row.datetime for row in self.rows}
+        }
+
+    @property
+    def data(self):
+        datetimes = self.get_datetimes()
+        counter_url = self.counter_url
+        data = []
+        for (
+            typeofmeasurement,
+            phenomenondurationseconds,
+            vehicletype,
+            direction,
+            unit,
+            value,
+            datetime,
+            source,
+            counter_id,
+        ) in self.rows:
+            observation = {
+                "typeofmeasurement": typeofmeasurement,
+                "phenomenondurationseconds": phenomenondurationseconds,
+                "vehicletype": vehicletype,
+                "direction": direction,
+                "unit": unit,
+                "value": value,
+                "datetime": datetimes[datetime],
+                "source": source,
+            }
+            if counter_url is not None:
+                observation["counter"] = counter_url(counter_id)
+            observation["counter_id"] = counter_id
+            data.append(observation)
+        return data
+
+    @property
+    def csv_header(self):
+        # Sorted like PaginatedCSVRenderer
+        header = (
+            "counter",
+            "counter_id",
+            "datetime",
+            "direction",
+            "phenomenondurationseconds",
+            "source",
+            "typeofmeasurement",
+            "unit",
+            "value",
+            "vehicletype",
+        )
+        return header if self.counter_url is not None else header[1:]
+
+    @property
+    def csv_rows(self):
+        datetimes = self.get_datetimes()
+        rows = [
+            (
+                row.counter_id,
+                datetimes[row.datetime],
+                row.direction,
+                row.phenomenondurationseconds,
+                row.source,
+                row.typeofmeasurement,
+                row.unit,
+                row.value,
+                row.vehicletype,
+            )
+            for row in self.rows
+        ]
+        if self.counter_url is None:
+            return rows
+        counter_url = self.counter_url
+        return [(counter_url(row[0]), *row) for row in rows]
+
+
 @extend_schema_serializer(
     examples=[
         OpenApiExample(
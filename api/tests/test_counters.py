@@ -1,9 +1,15 @@
+import json
+
 import pytest
 from django.contrib.gis.geos import GEOSGeometry, Point
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from geopy.distance import geodesic
 
+from api.caching import bump_data_version
 from api.models import Counter, Datasource
+from api.serializers import CounterFeatureSerializer, CounterSerializer
 from api.views import CounterViewSet
 
 
@@ -223,3 +229,121 @@ def test_geojson_area_filter(api_client, geojson_area):
             srid=4326,
         )
         assert not geometry.contains(counter_point)
+
+
+# Repeated requests are served from the response cache until the data changes
+@pytest.mark.django_db
+def test_counter_list_response_cache(
+    api_client, settings, django_assert_max_num_queries
+):
+    settings.API_CACHE_ENABLED = True
+    url = reverse("counter-list")
+    response = api_client.get(url, {"page_size": 10})
+    assert response.status_code == 200
+
+    # Only the data version is queried
+    with django_assert_max_num_queries(1):
+        cached_response = api_client.get(url, {"page_size": 10})
+    assert cached_response.content == response.content
+    assert cached_response["Content-Type"] == response["Content-Type"]
+
+    bump_data_version()
+    with CaptureQueriesContext(connection) as queries:
+        refreshed_response = api_client.get(url, {"page_size": 10})
+    assert len(queries) > 1
+    assert refreshed_response.data == response.data
+
+
+# The fast counter serializer outputs the same features as the model serializer
+@pytest.mark.django_db
+def test_counter_feature_serializer_output():
+    queryset = Counter.objects.all()
+    rows = CounterFeatureSerializer.get_rows(queryset)
+    assert CounterFeatureSerializer(rows).data == (
+        CounterSerializer(queryset, many=True).data
+    )
+
+
+# The database built GeoJSON has the same features as the paginated JSON response
+@pytest.mark.django_db
+def test_counter_list_geojson_format(api_client):
+    url = reverse("counter-list")
+    datasource_name = Datasource.objects.values_list("name", flat=True)[0]
+    parameters = {
+        "source": datasource_name,
+        "page_size": CounterViewSet.pagination_class().max_page_size,
+    }
+    response = api_client.get(url, {**parameters, "format": "geojson"})
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/geo+json"
+    feature_collection = json.loads(response.content)
+
+    json_response = api_client.get(url, parameters)
+    assert json_response.data["next"] is None
+    assert feature_collection == {
+        "type": "FeatureCollection",
+        "features": json.loads(json_response.content)["results"]["features"],
+    }
+
+
+# The distance search is not available in the database built GeoJSON
+@pytest.mark.django_db
+def test_counter_list_geojson_format_distance(api_client, middle_counter):
+    url = reverse("counter-list")
+    response = api_client.get(
+        url,
+        {
+            "latitude": middle_counter.latitude,
+            "longitude": middle_counter.longitude,
+            "distance": 2,
+            "format": "geojson",
+        },
+    )
+    assert response.status_code == 400
+
+
+# Counter tiles are served as vector tiles which can be revalidated with the ETag
+@pytest.mark.django_db
+def test_counter_tile(api_client):
+    url = reverse("counter-tile", kwargs={"z": 0, "x": 0, "y": 0})
+    response = api_client.get(url)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/vnd.mapbox-vector-tile"
+    assert len(response.content) > 0
+
+    not_modified_response = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert not_modified_response.status_code == 304
+    assert not_modified_response["ETag"] == response["ETag"]
+    assert not_modified_response["Cache-Control"] == response["Cache-Control"]
+
+    response = api_client.get(url, {"municipality_code": "999"})
+    assert response.status_code == 200 and response.content == b""
+
+    # Errors are JSON
+    url = reverse("counter-tile", kwargs={"z": 1, "x": 2, "y": 0})
+    response = api_client.get(url)
+    assert response.status_code == 404
+    assert response["Content-Type"] == "application/json"
+
+
+@pytest.mark.django_db
+def test_counter_list_conditional_get(api_client):
+    url = reverse("counter-list")
+    first_source, second_source = Datasource.objects.values_list("name", flat=True)[:2]
+    response = api_client.get(url, {"source": first_source})
+    assert response.status_code == 200 and response.has_header("Last-Modified")
+    etag = response["ETag"]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(
+            url, {"source": first_source}, HTTP_IF_NONE_MATCH=etag
+        )
+    assert response.status_code == 304
+    assert len(queries) == 1
+
+    response = api_client.get(url, {"source": second_source}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+    bump_data_version()
+    response = api_client.get(url, {"source": first_source}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
@@ -1,12 +1,25 @@
-from datetime import datetime
+import csv
+import io
+import json
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.models import Count
 from django.urls import reverse
 from django.utils.timezone import make_aware
+from prometheus_client.parser import text_string_to_metric_families
 
+from api.management.commands.observation_indexes import VIEW_TABLES_QUERY
 from api.models import Counter, Datasource, Observation
+from api.paginators import ObservationsCursorPagination
+from api.serializers import ObservationRowSerializer, ObservationSerializer
+from api.views import ObservationViewSet
 
 
 @pytest.fixture()
@@ -136,3 +149,331 @@ def test_source_and_counter_filter(api_client):
         url, {"source": datasource_name, "counter": invalid_counter_ids}
     )
     assert len(invalid_counter_ids_response.data["results"]) == 0
+
+
+# Export streams every filtered observation without pagination
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+def test_export_csv(api_client, observation_parameters):
+    filter_parameters = {
+        key: value
+        for key, value in observation_parameters.items()
+        if key != "page_size"
+    }
+    list_response = api_client.get(
+        reverse("observation-list"), {**filter_parameters, "page": 1}
+    )
+    response = api_client.get(
+        reverse("observation-export"), {**filter_parameters, "format": "csv"}
+    )
+    assert response.status_code == 200 and response.streaming
+
+    content = b"".join(response.streaming_content).decode()
+    rows = list(csv.reader(content.splitlines()))
+    assert rows[0] == list(ObservationViewSet.export_fields)
+    assert len(rows) - 1 == list_response.data["count"]
+
+    counter_id_index = rows[0].index("counter_id")
+    for row in rows[1:]:
+        assert int(row[counter_id_index]) == observation_parameters["counter"]
+
+
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+def test_export_json_matches_list(api_client, observation_parameters):
+    filter_parameters = {
+        key: value
+        for key, value in observation_parameters.items()
+        if key != "page_size"
+    }
+    list_response = api_client.get(
+        reverse("observation-list"),
+        {**filter_parameters, "page": 1, "page_size": 100},
+    )
+    response = api_client.get(reverse("observation-export"), filter_parameters)
+    assert response.status_code == 200 and response.streaming
+
+    observations = json.loads(b"".join(response.streaming_content))
+    for exported, listed in zip(observations, list_response.data["results"]):
+        assert exported["datetime"] == listed["datetime"]
+        assert exported["counterId"] == listed["counter_id"]
+
+
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+def test_list_csv_matches_json(api_client, observation_parameters):
+    url = reverse("observation-list")
+    json_response = api_client.get(url, observation_parameters)
+    response = api_client.get(url, {**observation_parameters, "format": "csv"})
+    assert response.status_code == 200
+
+    rows = list(csv.DictReader(response.content.decode().splitlines()))
+    assert list(rows[0]) == sorted(json_response.data["results"][0])
+    assert len(rows) == len(json_response.data["results"])
+    for row, observation in zip(rows, json_response.data["results"]):
+        assert row == {
+            key: "" if value is None else str(value)
+            for key, value in observation.items()
+        }
+
+
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+def test_export_parquet(api_client, observation_parameters):
+    filter_parameters = {
+        key: value
+        for key, value in observation_parameters.items()
+        if key != "page_size"
+    }
+    list_response = api_client.get(
+        reverse("observation-list"), {**filter_parameters, "page": 1}
+    )
+    response = api_client.get(
+        reverse("observation-export"), {**filter_parameters, "format": "parquet"}
+    )
+    assert response.status_code == 200 and response.streaming
+
+    table = pq.read_table(io.BytesIO(b"".join(response.streaming_content)))
+    assert table.schema.names == list(ObservationViewSet.export_fields)
+    assert table.num_rows == list_response.data["count"]
+    assert pa.types.is_dictionary(table.schema.field("source").type)
+    assert set(table.column("counter_id").to_pylist()) == {
+        observation_parameters["counter"]
+    }
+
+
+# Errors of the columnar formats are JSON
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+@pytest.mark.django_db
+def test_columnar_format_error(api_client, format):
+    for url in (reverse("observation-list"), reverse("observation-export")):
+        response = api_client.get(url, {"start_date": "abc", "format": format})
+        assert response.status_code == 400
+        assert response["Content-Type"] == "application/json"
+        assert "startDate" in json.loads(response.content)
+
+
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+def test_list_arrow_matches_json(api_client, observation_parameters):
+    url = reverse("observation-list")
+    json_response = api_client.get(url, observation_parameters)
+    response = api_client.get(url, {**observation_parameters, "format": "arrow"})
+    assert response.status_code == 200
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    observations = json_response.data["results"]
+    assert table.num_rows == len(observations)
+    for row, observation in zip(table.to_pylist(), observations):
+        assert row["datetime"] == datetime.fromisoformat(observation["datetime"])
+        assert row["value"] == observation["value"]
+        assert row["direction"] == observation["direction"]
+
+
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+def test_list_conditional_get(api_client, observation_parameters):
+    url = reverse("observation-list")
+    response = api_client.get(url, observation_parameters)
+    assert response.status_code == 200
+
+    response = api_client.get(
+        url,
+        observation_parameters,
+        HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+    )
+    assert response.status_code == 304
+
+    response = api_client.get(
+        url,
+        {**observation_parameters, "format": "csv"},
+        HTTP_IF_NONE_MATCH=api_client.get(url, observation_parameters)["ETag"],
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_observation_indexes_command():
+    output = io.StringIO()
+    call_command("observation_indexes", stdout=output)
+    report = output.getvalue()
+    with connection.cursor() as cursor:
+        cursor.execute(VIEW_TABLES_QUERY)
+        tables = cursor.fetchall()
+    assert tables
+    for schema, table in tables:
+        assert f"{schema}.{table}" in report
+    assert "ordering: " in report and "counter: " in report
+    assert "Daily aggregates of a counter" in report
+
+
+# Explaining the queries of a counter without observations is an error
+@pytest.mark.django_db
+def test_observation_indexes_command_counter_without_observations():
+    counter_id = Counter.objects.order_by("-id").values_list("id", flat=True)[0] + 1
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO lido.ecocounter_counters (id, name) VALUES (%s, %s)",
+            [counter_id, "Without observations"],
+        )
+    with pytest.raises(CommandError, match=f"Counter {counter_id} has no observations"):
+        call_command("observation_indexes", counter=counter_id, stdout=io.StringIO())
+
+
+@pytest.mark.django_db
+def test_default_observation_window(api_client, settings):
+    url = reverse("observation-list")
+    counter = (
+        Counter.objects.filter(observation__isnull=False)
+        .order_by("-last_stored_observation")
+        .first()
+    )
+    settings.OBSERVATION_DEFAULT_LOOKBACK_DAYS = 3
+    response = api_client.get(url, {"counter": counter.id, "page": 1})
+    assert response.status_code == 200
+
+    last_date = counter.last_stored_observation.astimezone(
+        ZoneInfo("Europe/Helsinki")
+    ).date()
+    window_start = last_date - timedelta(days=3)
+    assert response["Observation-Window-Start"] == window_start.isoformat()
+    assert not response.has_header("Observation-Window-End")
+    for observation in response.data["results"]:
+        assert datetime.fromisoformat(observation["datetime"]).date() >= window_start
+
+    response = api_client.get(
+        url, {"counter": counter.id, "end_date": "2024-01-31", "page": 1}
+    )
+    assert response["Observation-Window-Start"] == "2024-01-28"
+    assert response["Observation-Window-End"] == "2024-01-31"
+
+
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+def test_row_serializer_matches_model_serializer(api_client, observation_parameters):
+    url = reverse("observation-list")
+    response = api_client.get(url, observation_parameters)
+    assert response.status_code == 200
+
+    queryset = Observation.objects.filter(
+        counter=observation_parameters["counter"]
+    ).order_by(*ObservationsCursorPagination.ordering)[
+        : observation_parameters["page_size"]
+    ]
+    request = response.wsgi_request
+    expected = ObservationSerializer(
+        queryset, many=True, context={"request": request}
+    ).data
+    rows = list(ObservationRowSerializer.get_rows(queryset))
+    assert ObservationRowSerializer(rows, request).data == expected
+
+    response = api_client.get(url, {**observation_parameters, "hyperlinks": "false"})
+    assert all("counter" not in row for row in response.data["results"])
+
+
+@pytest.mark.django_db
+def test_query_cost_limit(api_client, settings, observation_parameters):
+    url = reverse("observation-list")
+    settings.OBSERVATION_QUERY_COST_LIMIT = 0
+    response = api_client.get(url, {"order": "counter"})
+    assert response.status_code == 400
+    assert response.data["detail"].code == "query_cost_exceeded"
+    assert "`counter`" in response.data["detail"]
+    assert "`order`" in response.data["detail"]
+
+    response = api_client.get(reverse("observation-export"), observation_parameters)
+    assert response.status_code == 400
+
+    settings.OBSERVATION_QUERY_COST_LIMIT = None
+    response = api_client.get(url, observation_parameters)
+    assert response.status_code == 200
+
+
+# The cost of a page is estimated with the offset or cursor position it is read with
+@pytest.mark.django_db
+def test_query_cost_of_page(api_client, monkeypatch, observation_parameters):
+    checked_queries = []
+    monkeypatch.setattr(
+        ObservationViewSet,
+        "check_query_cost",
+        lambda self, queryset: checked_queries.append(str(queryset.query)),
+    )
+    url = reverse("observation-list")
+    parameters = {**observation_parameters, "page_size": 10}
+    response = api_client.get(url, {**parameters, "page": 3})
+    assert response.status_code == 200
+    assert "OFFSET 20" in checked_queries[-1]
+
+    response = api_client.get(url, parameters)
+    api_client.get(response.data["next"])
+    assert '"datetime") <=' in checked_queries[-1]
+
+
+@pytest.mark.django_db
+def test_statement_timeout_is_reset(api_client, settings, observation_parameters):
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW statement_timeout")
+        (default_timeout,) = cursor.fetchone()
+
+    settings.OBSERVATION_EXPORT_STATEMENT_TIMEOUT = 12.5
+    response = api_client.get(reverse("observation-export"), observation_parameters)
+    assert response.status_code == 200
+    b"".join(response.streaming_content)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW statement_timeout")
+        assert cursor.fetchone() == (default_timeout,)
+
+
+@pytest.mark.django_db
+def test_server_timing(api_client, observation_parameters):
+    url = reverse("observation-list")
+    response = api_client.get(url, observation_parameters)
+    assert response.status_code == 200
+    phases = {
+        metric.split(";")[0].strip() for metric in response["Server-Timing"].split(",")
+    }
+    assert {"sql", "paginate", "serialize", "view", "camelize", "render"} <= phases
+    assert "total" in phases
+
+    # Streamed responses only report the time until streaming starts
+    response = api_client.get(reverse("observation-export"), observation_parameters)
+    assert response.status_code == 200 and response.streaming
+    assert response["Server-Timing"].startswith("total;dur=")
+    assert "," not in response["Server-Timing"]
+
+
+@pytest.mark.django_db
+def test_metrics(api_client, observation_parameters):
+    response = api_client.get(reverse("observation-list"), observation_parameters)
+    assert response.status_code == 200
+
+    response = api_client.get(reverse("metrics"))
+    assert response.status_code == 200
+    samples = {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.content.decode())
+        for sample in family.samples
+    }
+    view = ("view", "observation-list")
+    assert samples[
+        ("lidotiku_request_duration_seconds_count", (("status", "200"), view))
+    ]
+    assert samples[
+        ("lidotiku_request_phase_duration_seconds_count", (("phase", "sql"), view))
+    ]
+    assert samples[("lidotiku_rows_total", (view,))] >= 1
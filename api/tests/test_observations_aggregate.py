@@ -1,7 +1,10 @@
+import io
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+import pyarrow.parquet as pq
 import pytest
+from django.core.management import call_command
 from django.db.models import Count
 from django.db.models.functions import TruncDate
 from django.urls import reverse
@@ -217,3 +220,96 @@ def test_multiple_counters(api_client, min_date, max_date):
         if not next_url:
             break
         response = api_client.get(next_url)
+
+
+# Rollups return the same aggregates as the raw observations
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+@pytest.mark.parametrize("period", ["hour", "day", "month"])
+@pytest.mark.parametrize("measurement_type", ["count", "speed"])
+def test_rollup_aggregates(
+    api_client, settings, single_counter_parameters, period, measurement_type
+):
+    url = reverse("observation-aggregate-list")
+    parameters = {
+        **single_counter_parameters,
+        "measurement_type": measurement_type,
+        "period": period,
+        "page": 1,
+        "page_size": 10000,
+    }
+    settings.OBSERVATION_ROLLUPS_ENABLED = False
+    raw_response = api_client.get(url, parameters)
+
+    call_command("refresh_observation_rollups", "--full")
+    settings.OBSERVATION_ROLLUPS_ENABLED = True
+    rollup_response = api_client.get(url, parameters)
+
+    assert rollup_response.status_code == 200
+    assert rollup_response.data["count"] == raw_response.data["count"]
+
+    def sort_key(item):
+        return item["start_time"], item["direction"], item["unit"] or ""
+
+    for raw_item, rollup_item in zip(
+        sorted(raw_response.data["results"], key=sort_key),
+        sorted(rollup_response.data["results"], key=sort_key),
+    ):
+        assert rollup_item == pytest.approx(raw_item)
+
+
+@pytest.mark.django_db
+def test_observations_aggregate_parquet(api_client, single_counter_parameters):
+    url = reverse("observation-aggregate-list")
+    parameters = {**single_counter_parameters, "period": "day", "order": "start_time"}
+    json_response = api_client.get(url, parameters)
+    response = api_client.get(url, {**parameters, "format": "parquet"})
+    assert response.status_code == 200
+
+    rows = pq.read_table(io.BytesIO(response.content)).to_pylist()
+    aggregates = json_response.data["results"]
+    assert len(rows) == len(aggregates)
+    for row, aggregate in zip(rows, aggregates):
+        assert row["start_time"] == datetime.fromisoformat(aggregate["start_time"])
+        assert row["aggregated_value"] == float(aggregate["aggregated_value"])
+
+
+# One request for several counters returns the aggregates of each counter
+@pytest.mark.filterwarnings(
+    "ignore:DateTimeField Observation.datetime received a naive datetime"
+)
+@pytest.mark.django_db
+def test_comma_separated_counters(api_client, min_date, max_date):
+    url = reverse("observation-aggregate-list")
+    counter_ids = list(
+        Counter.objects.filter(observation__isnull=False)
+        .values_list("id", flat=True)
+        .distinct()[:3]
+    )
+    parameters = {
+        "start_date": min_date,
+        "end_date": max_date,
+        "measurement_type": "count",
+        "period": "day",
+        "page_size": 10000,
+    }
+
+    def aggregates(counter):
+        response = api_client.get(url, {**parameters, "counter": counter})
+        assert response.status_code == 200
+        return {
+            (row["counter_id"], row["start_time"], row["direction"], row["unit"]): row[
+                "aggregated_value"
+            ]
+            for row in response.data["results"]
+        }
+
+    combined = aggregates(",".join(str(counter_id) for counter_id in counter_ids))
+    assert combined
+    assert {counter_id for counter_id, *_ in combined} <= set(counter_ids)
+    separate = {}
+    for counter_id in counter_ids:
+        separate.update(aggregates(counter_id))
+    assert combined == separate
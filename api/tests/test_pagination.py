@@ -1,11 +1,16 @@
+import json
 import math
 import secrets
+from base64 import b64decode
+from urllib import parse
 
 import pytest
-from django.db.models import Count
+from django.db.models import Count, Max, Min
 from django.urls import reverse
+from django.utils.timezone import localdate
 
 from api.models import Counter, Observation
+from api.paginators import ObservationsPageNumberPagination
 from api.views import CounterViewSet
 
 
@@ -29,6 +34,16 @@ def observation_parameters():
     }
 
 
+# Spans all observations, overriding the default observation window
+@pytest.fixture()
+def observation_bounds():
+    bounds = Observation.objects.aggregate(start=Min("datetime"), end=Max("datetime"))
+    return {
+        "start_date": localdate(bounds["start"]),
+        "end_date": localdate(bounds["end"]),
+    }
+
+
 # Observations should default to cursor pagination
 @pytest.mark.filterwarnings(
     "ignore:DateTimeField Observation.datetime received a naive datetime"
@@ -159,25 +174,59 @@ def test_observations_cursor_both_order_parameters(api_client):
 @pytest.mark.django_db
 def test_page_number_pagination_observation_total_count(api_client):
     url = reverse("observation-list")
-    response = api_client.get(url, {"page": 1, "page_size": 1000})
+    response = api_client.get(
+        url, {"page": 1, "page_size": 1000, "count_exact": "true"}
+    )
     assert response.status_code == 200 and len(response.data["results"]) > 0
     total_count = response.data["count"]
-    final_page_response = api_client.get(url, {"page": math.ceil(total_count / 1000)})
+    assert response.data["count_is_estimate"] is False
+    final_page_response = api_client.get(
+        url, {"page": math.ceil(total_count / 1000), "count_exact": "true"}
+    )
     assert (final_page_response.data["next"]) is None
 
 
+# PageNumber pagination: large result sets get an estimated count but exact links
+@pytest.mark.django_db
+def test_page_number_pagination_estimated_count(
+    api_client, monkeypatch, observation_bounds
+):
+    monkeypatch.setattr(ObservationsPageNumberPagination, "count_threshold", 10)
+    url = reverse("observation-list")
+    parameters = {**observation_bounds, "page_size": 10}
+    response = api_client.get(url, {**parameters, "page": 2})
+    assert response.status_code == 200 and len(response.data["results"]) == 10
+    assert response.data["count"] > 20 and response.data["count_is_estimate"] is True
+    assert "page=3" in response.data["next"]
+    assert response.data["previous"] is not None
+
+    exact_count = Observation.objects.filter(
+        datetime__date__gte=observation_bounds["start_date"],
+        datetime__date__lte=observation_bounds["end_date"],
+    ).count()
+    last_page = math.ceil(exact_count / 10)
+    response = api_client.get(url, {**parameters, "page": last_page})
+    assert response.status_code == 200 and response.data["next"] is None
+    response = api_client.get(url, {**parameters, "page": last_page + 1})
+    assert response.status_code == 404
+
+
 # PageNumber pagination: For datetime and counter both provided, first takes precedence
 @pytest.mark.django_db
-def test_observations_both_order_parameters(api_client):
+def test_observations_both_order_parameters(api_client, observation_bounds):
     # Cursor pagination
     url = reverse("observation-list")
-    response = api_client.get(url, {"order": "datetime,-counter", "page": "3"})
+    response = api_client.get(
+        url, {**observation_bounds, "order": "datetime,-counter", "page": "3"}
+    )
     assert response.status_code == 200 and len(response.data["results"]) > 0
     observations = response.data["results"]
     for current_observation, next_observation in zip(observations, observations[1:]):
         assert current_observation["datetime"] <= next_observation["datetime"]
 
-    response = api_client.get(url, {"order": "counter,-datetime", "page": "3"})
+    response = api_client.get(
+        url, {**observation_bounds, "order": "counter,-datetime", "page": "3"}
+    )
     assert response.status_code == 200 and len(response.data["results"]) > 0
     observations = response.data["results"]
     for current_observation, next_observation in zip(observations, observations[1:]):
@@ -185,9 +234,9 @@ def test_observations_both_order_parameters(api_client):
 
 
 @pytest.mark.django_db
-def test_cursor_validity(api_client):
+def test_cursor_validity(api_client, observation_bounds):
     url = reverse("observation-list")
-    response = api_client.get(url)
+    response = api_client.get(url, observation_bounds)
 
     second_page_url = response.data["next"]
     second_page_response = api_client.get(second_page_url)
@@ -282,3 +331,24 @@ def test_last_page_no_next_link(api_client):
     num_pages = math.ceil(total_count / page_size)
     final_page_response = api_client.get(url, {"page": num_pages})
     assert (final_page_response.data["next"]) is None
+
+
+# Cursor positions are typed, datetimes encoded as epoch microseconds
+@pytest.mark.django_db
+def test_cursor_typed_position(api_client):
+    url = reverse("observation-list")
+    response = api_client.get(url, {"page_size": 10})
+    next_url = response.data["next"]
+    encoded_cursor = parse.parse_qs(parse.urlparse(next_url).query)["cursor"][0]
+    cursor = parse.parse_qs(b64decode(encoded_cursor).decode())
+    position = json.loads(cursor["p"][0])
+    datetime_position, counter_position = position[:2]
+    assert isinstance(datetime_position, int)
+    assert counter_position == response.data["results"][-1]["counter_id"]
+
+    next_response = api_client.get(next_url)
+    assert next_response.status_code == 200
+    assert (
+        response.data["results"][-1]["datetime"]
+        >= next_response.data["results"][0]["datetime"]
+    )
@@ -0,0 +1,61 @@
+import json
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import pytest
+from django.utils.translation import gettext_lazy
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from api.renderers import FastCamelCaseJSONRenderer, ORJSONCamelCaseRenderer
+
+
+def test_fast_camel_case_renderer_matches_library():
+    data = {
+        "next": None,
+        gettext_lazy("lazy_key"): gettext_lazy("lazy value"),
+        "results": ReturnList(
+            [
+                ReturnDict(
+                    {
+                        "counter_id": 1,
+                        "datetime": datetime(2024, 1, 1, 12),
+                        "phenomenon_duration_2": Decimal("1.5"),
+                        "nested_values": ({"value_sum": 2}, [True, None]),
+                    },
+                    serializer=None,
+                )
+            ],
+            serializer=None,
+        ),
+        1: "integer key",
+    }
+    assert FastCamelCaseJSONRenderer().render(data) == (
+        CamelCaseJSONRenderer().render(data)
+    )
+
+
+def test_orjson_camel_case_renderer_matches_library():
+    data = {
+        "start_time": datetime(2024, 1, 1, 12, tzinfo=UTC),
+        "aggregated_value": Decimal("12.5"),
+        "description_en": "Line\u2028separator",
+        "results": [{"counter_id": 1, "value": 1.5}, (None, True)],
+        "large_value": 2**70,
+    }
+    assert ORJSONCamelCaseRenderer().render(data) == (
+        CamelCaseJSONRenderer().render(data)
+    )
+
+
+# Floats are equal but exponents are written differently, and NaN is null
+def test_orjson_camel_case_renderer_floats():
+    data = {"values": [1e20, 1e-7, 1.5e300, 5e-324, 123456789.123, 0.1]}
+    content = ORJSONCamelCaseRenderer().render(data)
+    assert content == b'{"values":[1e20,1e-7,1.5e300,5e-324,123456789.123,0.1]}'
+    assert json.loads(content) == json.loads(CamelCaseJSONRenderer().render(data))
+
+    data = {"values": [float("nan"), float("inf"), float("-inf")]}
+    assert ORJSONCamelCaseRenderer().render(data) == b'{"values":[null,null,null]}'
+    with pytest.raises(ValueError):
+        CamelCaseJSONRenderer().render(data)
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+
+# The schema view serves the rendered schema files with conditional GET support
+@pytest.mark.django_db
+def test_rendered_schema(api_client, settings, tmp_path):
+    settings.DEBUG = False
+    settings.OPENAPI_SCHEMA_DIR = str(tmp_path)
+    url = reverse("schema")
+    assert api_client.get(url).status_code == 404
+
+    call_command("render_schema")
+    response = api_client.get(url, {"format": "json"})
+    assert response.status_code == 200
+    assert "/api/counters/" in json.loads(response.content)["paths"]
+    assert "Last-Modified" in response
+
+    response = api_client.get(
+        url, {"format": "json"}, HTTP_IF_NONE_MATCH=response["ETag"]
+    )
+    assert response.status_code == 304
+
+
+# Schemas in other languages are generated on request
+@pytest.mark.django_db
+def test_rendered_schema_language(api_client, settings, tmp_path):
+    settings.DEBUG = False
+    settings.OPENAPI_SCHEMA_DIR = str(tmp_path)
+    call_command("render_schema")
+    url = reverse("schema")
+    response = api_client.get(url, {"format": "json", "lang": "fi"})
+    assert response.status_code == 200
+    assert "/api/counters/" in json.loads(response.content)["paths"]
+    assert "ETag" not in response
+
+    response = api_client.get(url, {"format": "json"})
+    assert response.status_code == 200 and "ETag" in response
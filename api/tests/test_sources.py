@@ -2,6 +2,7 @@ import pytest
 from django.urls import reverse
 
 from api.models import Datasource
+from api.utils import get_source_choices, refresh_source_choices
 
 
 @pytest.mark.django_db
@@ -30,3 +31,17 @@ def test_default_invalid_language_parameter(api_client):
     response = api_client.get(url, {"language": "de"})
 
     assert response.status_code == 400
+
+
+# Source choices are queried once per process until refreshed
+@pytest.mark.django_db
+def test_source_choices_memoized(django_assert_num_queries):
+    refresh_source_choices()
+    with django_assert_num_queries(1):
+        choices = get_source_choices()
+        assert get_source_choices() == choices
+    assert choices == sorted(Datasource.objects.values_list("name", flat=True))
+
+    refresh_source_choices()
+    with django_assert_num_queries(1):
+        get_source_choices()
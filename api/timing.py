@@ -0,0 +1,91 @@
+"""
+Measures the phases of a request, see api.middleware.ServerTimingMiddleware.
+
+Phases nest: `view` includes `sql`, `paginate` and `serialize`, and `render`
+includes `camelize`. Code measures itself with `timed` and `count`, which do
+nothing outside a measured request.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_timing: ContextVar["RequestTiming | None"] = ContextVar(
+    "RequestTiming", default=None
+)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_start: float | None = None
+        self.durations: dict[str, float] = defaultdict(float)
+        self.counts: dict[str, int] = defaultdict(int)
+
+    def add(self, phase: str, seconds: float):
+        self.durations[phase] += seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Database execute wrapper measuring the time spent in queries."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add("sql", time.perf_counter() - start)
+            self.counts["sql_queries"] += 1
+
+    def finish(self):
+        self.add("total", time.perf_counter() - self.start)
+
+    def keep_total(self):
+        """Drops the measurements other than the total duration."""
+        self.durations = defaultdict(float, total=self.durations["total"])
+        self.counts.clear()
+
+    def get_server_timing(self) -> str:
+        return ", ".join(
+            f"{phase};dur={seconds * 1000:.1f}"
+            for phase, seconds in self.durations.items()
+        )
+
+    def get_log_fields(self) -> dict[str, float | int]:
+        return {
+            **{
+                f"{phase}_ms": round(seconds * 1000, 1)
+                for phase, seconds in self.durations.items()
+            },
+            **self.counts,
+        }
+
+
+@contextmanager
+def measure_request():
+    """Measures the phases of the request handled within the block."""
+    timing = RequestTiming()
+    token = _current_timing.set(timing)
+    try:
+        yield timing
+    finally:
+        _current_timing.reset(token)
+
+
+@contextmanager
+def timed(phase: str):
+    """Adds the time spent within the block to a phase of the request."""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - start)
+
+
+def count(name: str, value: int):
+    """Adds to a count of the request, e.g. of rows."""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.counts[name] += value
@@ -15,5 +15,10 @@ router.register(r"metadata/sources", views.DatasourceViewSet, basename="sources"
 
 
 urlpatterns = [
+    path(
+        "counters/tiles/<int:z>/<int:x>/<int:y>.mvt",
+        views.CounterTileViewSet.as_view({"get": "retrieve"}),
+        name="counter-tile",
+    ),
     path("", include(router.urls)),
 ]
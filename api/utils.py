@@ -1,9 +1,31 @@
+from functools import cache
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+
 from api.models import Datasource
 
 
+@cache
+def get_source_choices() -> list[str]:
+    """
+    Returns the names of the data sources. Queried on first use and memoized
+    for the lifetime of the process, see `refresh_source_choices`.
+    """
+    return list(
+        Datasource.objects.values_list("name", flat=True).distinct().order_by("name")
+    )
+
+
+def refresh_source_choices():
+    """Makes the next `get_source_choices` call query the data sources again."""
+    get_source_choices.cache_clear()
+
+
 # Converts a paramater from string literal to enum with source names
 def sources_enum_parameter(parameters, parameter_name):
-    datasource_names = Datasource.objects.values_list("name", flat=True)
+    datasource_names = get_source_choices()
     return [
         (
             {**parameter, "schema": {"type": "string", "enum": datasource_names}}
@@ -14,7 +36,41 @@ def sources_enum_parameter(parameters, parameter_name):
     ]
 
 
+def source_enum_postprocessing_hook(result, generator, request, public):
+    """
+    Lists the data sources as the enum of every `source` parameter in the
+    generated schema. Resolved when the schema is generated rather than when
+    the views are imported, so that starting a worker needs no database.
+    The enums are left out if the database is not available when the schema
+    is generated on request in DEBUG; render_schema requires the database.
+    """
+    try:
+        get_source_choices()
+    except DatabaseError:
+        return result
+
+    for path in result.get("paths", {}).values():
+        for operation in path.values():
+            if isinstance(operation, dict) and "parameters" in operation:
+                operation["parameters"] = sources_enum_parameter(
+                    operation["parameters"], "source"
+                )
+    return result
+
+
 counter_alias_map = {
     "counter": "counter_id",
     "-counter": "-counter_id",
 }
+
+
+async def iterate_in_thread(iterator, batch_size=500):
+    """
+    Yields the items of a synchronous iterator, such as a streamed database
+    query, without blocking the event loop. Items are fetched in batches in
+    the request's sync thread, where its database connection lives.
+    """
+    next_batch = sync_to_async(lambda: list(islice(iterator, batch_size)))
+    while batch := await next_batch():
+        for item in batch:
+            yield item
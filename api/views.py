@@ -1,53 +1,256 @@
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from itertools import chain, islice
 
+import pyarrow as pa
+from django import forms
+from django.conf import settings
 from django.contrib.gis.db.models.functions import Distance as DistanceFunction
 from django.contrib.gis.gdal.error import GDALException
 from django.contrib.gis.geos import GEOSGeometry, Point
 from django.contrib.gis.geos.error import GEOSException
-from django.core.exceptions import FieldError, SuspiciousOperation
-from django.db import DatabaseError
-from django.db.models import Avg, F, Sum
-from django.db.models.expressions import Value
-from django.db.models.functions import Trunc
+from django.core.exceptions import EmptyResultSet, FieldError, SuspiciousOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError, connection
+from django.db.models import Avg, F, FloatField, Max, Sum
+from django.db.models.expressions import ExpressionWrapper, Value
+from django.db.models.functions import NullIf, Trunc
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.module_loading import import_string
+from django.utils.timezone import localdate, make_aware
 from django_filters import rest_framework as filters
-from djangorestframework_camel_case.render import (
-    CamelCaseBrowsableAPIRenderer,
-    CamelCaseJSONRenderer,
-)
+from djangorestframework_camel_case.render import CamelCaseBrowsableAPIRenderer
+from djangorestframework_camel_case.util import camelize
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
     OpenApiExample,
     OpenApiParameter,
     extend_schema,
     extend_schema_view,
 )
-from rest_framework import mixins, viewsets
-from rest_framework.exceptions import ValidationError
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from rest_framework import mixins, serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_csv.renderers import CSVRenderer
 
+from .caching import (
+    cache_response,
+    conditional_response,
+    get_data_version,
+    get_latest_stored_observation,
+    get_response_digest,
+)
 from .filters import (
     CounterFilter,
+    CounterTileFilter,
     DatasourceFilter,
     ObservationAggregateFilter,
     ObservationFilter,
 )
-from .models import Counter, Datasource, Observation
+from .models import (
+    Counter,
+    Datasource,
+    Observation,
+    ObservationDailyRollup,
+    ObservationHourlyRollup,
+)
 from .paginators import (
     LargeResultsSetPagination,
     ObservationsCursorPagination,
+    ObservationsPageNumberPagination,
     SmallResultsSetPagination,
 )
-from .renderers import FeaturesPaginatedCSVRenderer
+from .query_limits import (
+    QueryCostExceeded,
+    QueryTimeout,
+    get_query_cost,
+    is_query_canceled,
+    statement_timeout,
+)
+from .renderers import (
+    DICTIONARY_STRING,
+    ArrowRenderer,
+    ArrowTable,
+    ArrowTableRenderer,
+    CSVTable,
+    FeaturesPaginatedCSVRenderer,
+    GeoJSONRenderer,
+    MVTRenderer,
+    ParquetRenderer,
+    stream_csv,
+    stream_json,
+)
+from .schemas import get_schema_path, read_schema
 from .serializers import (
     CounterDistanceSerializer,
+    CounterFeatureSerializer,
     CounterFilterValidationSerializer,
     CounterSerializer,
     DatasourceSerializer,
     GeoJSONPolygonSerializer,
     ObservationAggregateSerializer,
+    ObservationRowSerializer,
     ObservationSerializer,
+    datetime_field,
 )
+from .timing import count, timed
+from .utils import iterate_in_thread
+
+
+class ObservationWindowMixin:
+    """
+    Limits the observations of a viewset to OBSERVATION_DEFAULT_LOOKBACK_DAYS
+    days before the end date, or before the latest stored observation of the
+    requested counters, when no start date is given. The bounds are compared
+    as datetime literals, so that only the partitions of the window are
+    scanned. The dates of the window are returned in the
+    Observation-Window-Start and Observation-Window-End headers.
+    """
+
+    date_field = forms.DateField(required=False)
+
+    def filter_queryset(self, queryset):
+        # Raises ValidationError for invalid dates before they are cleaned here
+        queryset = super().filter_queryset(queryset)
+        query_params = self.request.query_params
+        start_date = self.date_field.clean(query_params.get("start_date"))
+        end_date = self.date_field.clean(query_params.get("end_date"))
+        if start_date is None:
+            last_date = end_date or self.get_latest_observation_date()
+            if last_date is not None:
+                start_date = last_date - timedelta(
+                    days=settings.OBSERVATION_DEFAULT_LOOKBACK_DAYS
+                )
+                queryset = queryset.filter(
+                    datetime__gte=make_aware(datetime.combine(start_date, time.min))
+                )
+        self.observation_window = (start_date, end_date)
+        return queryset
+
+    def get_latest_observation(self):
+        """
+        Returns the latest stored observation of the requested counters. It is
+        read from the counters, so it is queried once per request and costs
+        the same however sparse the observations of the counters are.
+        """
+        if not hasattr(self, "_latest_observation"):
+            query_params = self.request.query_params
+            counters = Counter.objects.all()
+            if query_params.get("counter"):
+                try:
+                    counter_ids = [int(i) for i in query_params["counter"].split(",")]
+                except ValueError:
+                    # Invalid ids are rejected by the filters
+                    counter_ids = []
+                counters = counters.filter(pk__in=counter_ids)
+            if query_params.get("source"):
+                counters = counters.filter(source__iexact=query_params["source"])
+            self._latest_observation = counters.aggregate(
+                latest=Max("last_stored_observation")
+            )["latest"]
+        return self._latest_observation
+
+    def get_latest_observation_date(self):
+        latest = self.get_latest_observation()
+        return localdate(latest) if latest else None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        start_date, end_date = getattr(self, "observation_window", (None, None))
+        if start_date is not None:
+            response["Observation-Window-Start"] = start_date.isoformat()
+        if end_date is not None:
+            response["Observation-Window-End"] = end_date.isoformat()
+        return response
+
+
+class JSONErrorMixin:
+    """
+    Renders the error responses of the binary formats of a viewset, the
+    renderers in `json_error_renderer_classes`, as JSON under the JSON media
+    type, so that clients can read them.
+    """
+
+    json_error_renderer_classes: tuple[type, ...] = ()
+
+    def handle_exception(self, exc):
+        response = super().handle_exception(exc)
+        accepted_renderer = getattr(self.request, "accepted_renderer", None)
+        if isinstance(accepted_renderer, self.json_error_renderer_classes):
+            renderer = import_string(settings.JSON_RENDERER)()
+            self.request.accepted_renderer = renderer
+            self.request.accepted_media_type = renderer.media_type
+        return response
+
+
+class QueryLimitMixin:
+    """
+    Bounds the database queries of a viewset. The queries of each action run
+    with the statement_timeout of the setting named in
+    `statement_timeout_settings`, and queries passed to `check_query_cost`,
+    such as the page queries of the paginators with their offset or cursor
+    position, are rejected when the planner estimates them to cost more than
+    OBSERVATION_QUERY_COST_LIMIT. Both errors tell which filters narrow the
+    query down.
+    """
+
+    statement_timeout_settings: dict[str, str] = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        setting = self.statement_timeout_settings.get(
+            self.action_map.get(request.method.lower())
+        )
+        with statement_timeout(getattr(settings, setting) if setting else None):
+            return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if is_query_canceled(exc):
+            exc = QueryTimeout(
+                f"{QueryTimeout.default_detail} {self.get_narrowing_hint()}"
+            )
+        return super().handle_exception(exc)
+
+    def check_query_cost(self, queryset):
+        limit = settings.OBSERVATION_QUERY_COST_LIMIT
+        if limit is None:
+            return
+        cost = get_query_cost(queryset)
+        if cost > limit:
+            raise QueryCostExceeded(
+                f"{QueryCostExceeded.default_detail} The estimated cost "
+                f"{cost:.0f} exceeds the limit of {limit:.0f}. "
+                f"{self.get_narrowing_hint()}"
+            )
+
+    def get_narrowing_hint(self) -> str:
+        query_params = self.request.query_params
+        hints = []
+        if not query_params.get("counter"):
+            hints.append("filter by `counter`")
+        hints.append("give a shorter period with `start_date` and `end_date`")
+        order = query_params.get("order", "").lstrip("-")
+        if order and not order.startswith(("datetime", "start_time")):
+            hints.append("leave out `order`")
+        return f"Narrow the query down: {', or '.join(hints)}."
+
+
+class TimedPaginationMixin:
+    """
+    Measures the pagination of a viewset, including its queries, and counts
+    the rows of the page, see api.timing.
+    """
+
+    def paginate_queryset(self, queryset):
+        with timed("paginate"):
+            page = super().paginate_queryset(queryset)
+        if page is not None:
+            count("rows", len(page))
+        return page
 
 
 # pylint: disable=no-member
@@ -63,18 +266,6 @@ class BaseCSVRetrieveViewSet(viewsets.GenericViewSet):
             return super().get_renderers()
 
 
-def get_source_choices():
-    """Get available source values from the database"""
-    try:
-        return list(
-            Datasource.objects.values_list("name", flat=True)
-            .distinct()
-            .order_by("name")
-        )
-    except RuntimeError:
-        return []  # Return empty list if DB not available (e.g., during tests)
-
-
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -94,16 +285,17 @@ def get_source_choices():
                 location=OpenApiParameter.QUERY,
                 description="Data source.",
                 explode=False,
-                enum=get_source_choices(),
             ),
             OpenApiParameter(
                 name="format",
                 type=str,
                 location=OpenApiParameter.QUERY,
                 description="Output format. Default is JSON. Use `format=csv` "
-                "for CSV format.",
+                "for CSV format. `format=geojson` returns all matching counters "
+                "as a single GeoJSON FeatureCollection without pagination, and "
+                "cannot be combined with the distance search.",
                 explode=False,
-                enum=["json", "csv", "api"],
+                enum=["json", "csv", "api", "geojson"],
             ),
             OpenApiParameter(
                 name="latitude",
@@ -173,9 +365,10 @@ class CounterViewSet(
     # Defining renderers explicitly to replace default PaginatedCSVRenderer
     # with FeaturesPaginatedCSVRenderer which maps the data from features object
     renderer_classes = [
-        CamelCaseJSONRenderer,
+        import_string(settings.JSON_RENDERER),
         CamelCaseBrowsableAPIRenderer,
         FeaturesPaginatedCSVRenderer,
+        GeoJSONRenderer,
     ]
 
     def get_queryset(self):
@@ -222,7 +415,14 @@ class CounterViewSet(
         try:
             geometry = GEOSGeometry(str(geojson_data), srid=4326)
             counters = Counter.objects.filter(geom__within=geometry)
-            serializer = self.get_serializer(counters, many=True)
+            if request.accepted_renderer.format == "geojson":
+                return Response(
+                    CounterFeatureSerializer.get_feature_collection(counters),
+                    status=200,
+                )
+            serializer = CounterFeatureSerializer(
+                CounterFeatureSerializer.get_rows(counters)
+            )
             data = {"type": "FeatureCollection", "features": serializer.data}
             return Response(data, status=200)
         except (
@@ -238,7 +438,12 @@ class CounterViewSet(
         ):
             return Response({"error": "Unable to process the request."}, status=500)
 
-    # pylint: disable-next=useless-parent-delegation
+    def get_last_modified(self, request):
+        # Counters change when observations are stored for them
+        return get_latest_stored_observation()
+
+    @conditional_response
+    @cache_response
     def retrieve(self, request, *args, **kwargs):
         """
         Returns the information of a counter with the given identifier.
@@ -246,15 +451,133 @@ class CounterViewSet(
         # The comment above is used to define a description for apidocs.
         return super().retrieve(request, *args, **kwargs)
 
+    @conditional_response
+    @cache_response
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(self.paginate_queryset(queryset), many=True)
-        paginated_response = self.get_paginated_response(serializer.data).data
-        results = {"type": "FeatureCollection", "features": serializer.data}
+        if request.accepted_renderer.format == "geojson":
+            if self.get_serializer_class() is CounterDistanceSerializer:
+                # The features built by the database have no distance
+                raise ValidationError(
+                    {"format": "The geojson format cannot be combined with distance."}
+                )
+            # All matching counters in one FeatureCollection, without pagination
+            return Response(
+                CounterFeatureSerializer.get_feature_collection(queryset), status=200
+            )
+        if self.get_serializer_class() is CounterSerializer:
+            rows = CounterFeatureSerializer.get_rows(queryset)
+            serializer = CounterFeatureSerializer(self.paginate_queryset(rows))
+            if request.accepted_renderer.format == "csv":
+                return Response(
+                    CSVTable(CounterFeatureSerializer.csv_header, serializer.csv_rows),
+                    status=200,
+                )
+        else:
+            serializer = self.get_serializer(
+                self.paginate_queryset(queryset), many=True
+            )
+        features = serializer.data
+        paginated_response = self.get_paginated_response(features).data
+        results = {"type": "FeatureCollection", "features": features}
         response_data = {**paginated_response, "results": results}
         return Response(response_data, status=200)
 
 
+@extend_schema_view(
+    retrieve=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="municipality_code",
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description="Finnish municipality code of counter location "
+                "(e.g. 091 for Helsinki, 092 for Vantaa, and 049 for Espoo), "
+                "leading zero is optional.",
+                explode=False,
+            ),
+            OpenApiParameter(
+                name="source",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="Data source.",
+                explode=False,
+            ),
+        ],
+        responses={(200, MVTRenderer.media_type): OpenApiTypes.BINARY},
+    ),
+)
+class CounterTileViewSet(JSONErrorMixin, viewsets.GenericViewSet):
+    """
+    Returns the counters within a map tile as a Mapbox Vector Tile with a
+    single layer named `counters`. Tiles are addressed by zoom level and
+    column and row in the Web Mercator tile grid.
+    """
+
+    filter_backends = (filters.DjangoFilterBackend,)
+    filterset_class = CounterTileFilter
+    pagination_class = None
+    queryset = Counter.objects.all()
+    renderer_classes = [MVTRenderer]
+    json_error_renderer_classes = (MVTRenderer,)
+    max_zoom = 22
+    # Counters are clipped with a buffer of 64 of the 4096 units of a tile
+    tile_sql = """
+        WITH counters AS ({counters}),
+        tile_bounds AS (
+            SELECT
+                ST_TileEnvelope(z, x, y) AS geom,
+                ST_TileEnvelope(z, x, y, margin => 64.0 / 4096) AS buffered_geom
+            FROM (SELECT %s::integer AS z, %s::integer AS x, %s::integer AS y) AS tile
+        )
+        SELECT ST_AsMVT(features, 'counters', 4096, 'geom')
+        FROM (
+            SELECT
+                ST_AsMVTGeom(
+                    ST_Transform(counters.geom, 3857), tile_bounds.geom, 4096, 64, true
+                ) AS geom,
+                counters.id,
+                counters.name,
+                counters.source,
+                '0' || counters.municipality_code AS "municipalityCode",
+                counters.data_received AS "dataReceived"
+            FROM counters, tile_bounds
+            WHERE counters.geom && ST_Transform(tile_bounds.buffered_geom, 4326)
+        ) AS features
+    """
+
+    def retrieve(self, request, z, x, y):
+        if not (0 <= z <= self.max_zoom and 0 <= x < 2**z and 0 <= y < 2**z):
+            raise NotFound("Tile coordinates are out of range.")
+
+        etag = quote_etag(get_response_digest(request, get_data_version()))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            # A 304 carries the validator and caching headers of the 200
+            return self.set_cache_headers(not_modified, etag)
+
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            "id", "name", "source", "municipality_code", "data_received", "geom"
+        )
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            tile = b""
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(self.tile_sql.format(counters=sql), [*params, z, x, y])
+                tile = bytes(cursor.fetchone()[0])
+
+        return self.set_cache_headers(Response(tile), etag)
+
+    @staticmethod
+    def set_cache_headers(response, etag):
+        response["ETag"] = etag
+        # Clients may store tiles, but revalidate them with the ETag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -296,10 +619,39 @@ class CounterViewSet(
                 "Use '-' prefix for descending order.",
                 explode=False,
             ),
+            OpenApiParameter(
+                name="hyperlinks",
+                type=bool,
+                location=OpenApiParameter.QUERY,
+                description="Set to false to leave out the `counter` URL of "
+                "each observation.",
+                explode=False,
+            ),
         ],
-    )
+    ),
+    export=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="format",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="Output format. Default is JSON. Use `format=csv` "
+                "for CSV format, `format=parquet` for Parquet and `format=arrow` "
+                "for the Arrow IPC streaming format.",
+                explode=False,
+                enum=["json", "csv", "parquet", "arrow"],
+            ),
+        ],
+    ),
 )
-class ObservationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class ObservationViewSet(
+    JSONErrorMixin,
+    QueryLimitMixin,
+    TimedPaginationMixin,
+    ObservationWindowMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
     """
     Returns a paged and sorted list of observations produced by counters,
     matching the given search criteria.
@@ -310,6 +662,34 @@ class ObservationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     pagination_class = ObservationsCursorPagination
     serializer_class = ObservationSerializer
     queryset = Observation.objects.all()
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES,
+        ParquetRenderer,
+        ArrowRenderer,
+    ]
+    json_error_renderer_classes = (ArrowTableRenderer,)
+    statement_timeout_settings = {
+        "list": "OBSERVATION_STATEMENT_TIMEOUT",
+        "export": "OBSERVATION_EXPORT_STATEMENT_TIMEOUT",
+    }
+    # Columns of the export action, read straight from the database
+    export_fields = ObservationRowSerializer.row_fields
+    # Rows fetched per round trip from the server-side cursor
+    export_chunk_size = 2000
+    # Columns of the export action in the columnar formats
+    arrow_schema = pa.schema(
+        [
+            ("typeofmeasurement", DICTIONARY_STRING),
+            ("phenomenondurationseconds", pa.int64()),
+            ("vehicletype", DICTIONARY_STRING),
+            ("direction", DICTIONARY_STRING),
+            ("unit", DICTIONARY_STRING),
+            ("value", pa.int64()),
+            ("datetime", pa.timestamp("us", tz=settings.TIME_ZONE)),
+            ("source", DICTIONARY_STRING),
+            ("counter_id", pa.int64()),
+        ]
+    )
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -321,9 +701,87 @@ class ObservationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
             pass
 
         if "page" in self.request.query_params:
-            self.pagination_class = LargeResultsSetPagination
+            self.pagination_class = ObservationsPageNumberPagination
         return queryset
 
+    def get_last_modified(self, request):
+        # The observations change when new ones are stored for their counters
+        return self.get_latest_observation()
+
+    @conditional_response
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.paginate_queryset(ObservationRowSerializer.get_rows(queryset))
+        if isinstance(request.accepted_renderer, ArrowTableRenderer):
+            return Response(ArrowTable(self.arrow_schema, rows))
+
+        hyperlinks = request.query_params.get("hyperlinks", "").lower() != "false"
+        serializer = ObservationRowSerializer(rows, request, hyperlinks=hyperlinks)
+        with timed("serialize"):
+            if request.accepted_renderer.format == "csv":
+                return Response(CSVTable(serializer.csv_header, serializer.csv_rows))
+            data = serializer.data
+        return self.get_paginated_response(data)
+
+    @action(detail=False, pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        """
+        Streams all observations matching the given search criteria
+        without pagination.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        self.check_query_cost(queryset)
+        rows = queryset.values_list(*self.export_fields).iterator(
+            chunk_size=self.export_chunk_size
+        )
+        # Runs the query before the response starts, so that a timeout is
+        # answered with an error instead of cutting the stream short
+        rows = chain(list(islice(rows, 1)), rows)
+
+        renderer = request.accepted_renderer
+        if isinstance(renderer, ArrowTableRenderer):
+            response = StreamingHttpResponse(
+                self._streaming_content(renderer.stream(self.arrow_schema, rows)),
+                content_type=renderer.media_type,
+            )
+            response["Content-Disposition"] = (
+                f'attachment; filename="observations.{renderer.extension}"'
+            )
+            return response
+
+        rows = self._format_export_rows(rows)
+
+        if request.accepted_renderer.format == "csv":
+            response = StreamingHttpResponse(
+                self._streaming_content(stream_csv(self.export_fields, rows)),
+                content_type="text/csv",
+            )
+            response["Content-Disposition"] = 'attachment; filename="observations.csv"'
+            return response
+
+        keys = list(camelize(dict.fromkeys(self.export_fields)))
+        return StreamingHttpResponse(
+            self._streaming_content(stream_json(keys, rows)),
+            content_type="application/json",
+        )
+
+    def _streaming_content(self, content):
+        # Under ASGI a synchronous iterator would be read whole into memory
+        # before sending, so stream it through the event loop instead
+        if isinstance(self.request._request, ASGIRequest):
+            return iterate_in_thread(content)
+        return content
+
+    def _format_export_rows(self, rows):
+        datetime_serializer = serializers.DateTimeField()
+        datetime_index = self.export_fields.index("datetime")
+        for row in rows:
+            row = list(row)
+            row[datetime_index] = datetime_serializer.to_representation(
+                row[datetime_index]
+            )
+            yield row
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -331,8 +789,11 @@ class ObservationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
             OpenApiParameter(
                 name="counter",
                 type=int,
+                many=True,
+                required=True,
                 location=OpenApiParameter.QUERY,
-                description="Filter observations by counter ID.",
+                description="Counter IDs, separated by commas. The aggregates of "
+                "each counter are identified by their `counterId`.",
                 explode=False,
             ),
             OpenApiParameter(
@@ -385,7 +846,14 @@ class ObservationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         ],
     )
 )
-class ObservationAggregateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class ObservationAggregateViewSet(
+    JSONErrorMixin,
+    QueryLimitMixin,
+    TimedPaginationMixin,
+    ObservationWindowMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
     """
     Returns a paged and sorted list of the observational data,
     aggregated over the given period and matching the search criteria.
@@ -396,6 +864,42 @@ class ObservationAggregateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet
     pagination_class = LargeResultsSetPagination
     serializer_class = ObservationAggregateSerializer
     queryset = Observation.objects.all()
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES,
+        ParquetRenderer,
+        ArrowRenderer,
+    ]
+    json_error_renderer_classes = (ArrowTableRenderer,)
+    statement_timeout_settings = {"list": "OBSERVATION_AGGREGATE_STATEMENT_TIMEOUT"}
+    # Coarsest rollup able to answer each period, used instead of raw
+    # observations when OBSERVATION_ROLLUPS_ENABLED is set
+    rollup_models = {
+        "hour": ObservationHourlyRollup,
+        "day": ObservationDailyRollup,
+        "week": ObservationDailyRollup,
+        "month": ObservationDailyRollup,
+        "year": ObservationDailyRollup,
+    }
+    # Columns of the CSV format of the list, sorted like PaginatedCSVRenderer
+    csv_header = (
+        "aggregated_value",
+        "counter_id",
+        "direction",
+        "period",
+        "start_time",
+        "unit",
+    )
+    # Columns of the list in the columnar formats
+    arrow_schema = pa.schema(
+        [
+            ("period", DICTIONARY_STRING),
+            ("counter_id", pa.int64()),
+            ("start_time", pa.timestamp("us", tz=settings.TIME_ZONE)),
+            ("direction", DICTIONARY_STRING),
+            ("unit", DICTIONARY_STRING),
+            ("aggregated_value", pa.float64()),
+        ]
+    )
 
     def get_queryset(self):
         try:  # Try-except required for schema generation to work with django-filter
@@ -407,14 +911,25 @@ class ObservationAggregateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet
         except AttributeError:
             measurement_type = None
 
-        if measurement_type == "speed":
-            aggregation_calc: Avg | Sum = Avg("value")
-        else:  # measurement_type == "count"
-            aggregation_calc = Sum("value")
+        rollup_model = self.rollup_models.get(period)
+        if settings.OBSERVATION_ROLLUPS_ENABLED and rollup_model is not None:
+            queryset = rollup_model.objects.values("typeofmeasurement")
+            if measurement_type == "speed":
+                aggregation_calc: Avg | Sum | ExpressionWrapper = ExpressionWrapper(
+                    Sum("value_sum") / NullIf(Sum("value_count"), 0),
+                    output_field=FloatField(),
+                )
+            else:  # measurement_type == "count"
+                aggregation_calc = Sum("value_sum")
+        else:
+            queryset = self.queryset.values("typeofmeasurement", "source")
+            if measurement_type == "speed":
+                aggregation_calc = Avg("value")
+            else:  # measurement_type == "count"
+                aggregation_calc = Sum("value")
 
         queryset = (
-            self.queryset.values("typeofmeasurement", "source")
-            .annotate(start_time=Trunc("datetime", kind=period))
+            queryset.annotate(start_time=Trunc("datetime", kind=period))
             .values(
                 "start_time",
                 "counter_id",
@@ -427,11 +942,55 @@ class ObservationAggregateViewSet(mixins.ListModelMixin, viewsets.GenericViewSet
         try:  # Try-except required for schema generation to work with django-filter
             filter_params = self.request.GET.copy()
             if "order" not in filter_params:
-                queryset = queryset.order_by("-start_time")
+                # Counters keep the same order within each period
+                queryset = queryset.order_by("-start_time", "counter_id")
         except AttributeError:
             pass
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.paginate_queryset(queryset)
+        if isinstance(request.accepted_renderer, ArrowTableRenderer):
+            return Response(
+                ArrowTable(
+                    self.arrow_schema,
+                    [
+                        (
+                            row["period"],
+                            row["counter_id"],
+                            row["start_time"],
+                            row["direction"],
+                            row["unit"],
+                            # Sums are numeric, which pyarrow does not convert
+                            None
+                            if row["aggregated_value"] is None
+                            else float(row["aggregated_value"]),
+                        )
+                        for row in rows
+                    ],
+                )
+            )
+        if request.accepted_renderer.format != "csv":
+            serializer = self.get_serializer(rows, many=True)
+            with timed("serialize"):
+                data = serializer.data
+            return self.get_paginated_response(data)
+
+        with timed("serialize"):
+            csv_rows = [
+                (
+                    row["aggregated_value"],
+                    row["counter_id"],
+                    row["direction"],
+                    row["period"],
+                    datetime_field.to_representation(row["start_time"]),
+                    row["unit"],
+                )
+                for row in rows
+            ]
+        return Response(CSVTable(self.csv_header, csv_rows))
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -492,6 +1051,14 @@ class DatasourceViewSet(
     filter_backends = (filters.DjangoFilterBackend,)
     pagination_class = None
 
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_queryset(self):
         queryset = self.queryset
         try:  # Try-except required for schema generation to work with django-filter
@@ -510,6 +1077,50 @@ class DatasourceViewSet(
         return queryset.order_by("name")
 
 
+class StaticSchemaView(SpectacularAPIView):
+    """
+    Serves the OpenAPI schema rendered by the render_schema management
+    command, with ETag and Last-Modified headers for conditional requests.
+    The schema is generated on request only in DEBUG, if it has not been
+    rendered, and for the `lang` and `version` parameters, as the rendered
+    schema is of the default language and version.
+    """
+
+    generated_query_params = ("lang", "version")
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        query_params = request.query_params
+        if any(query_params.get(param) for param in self.generated_query_params):
+            return super().get(request, *args, **kwargs)
+
+        format = request.accepted_renderer.format
+        try:
+            content, etag, modified = read_schema(format)
+        except FileNotFoundError:
+            if settings.DEBUG:
+                return super().get(request, *args, **kwargs)
+            raise NotFound("The schema has not been rendered.")
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=int(modified)
+        )
+        if not_modified is not None:
+            return not_modified
+
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(modified)
+        response["Content-Disposition"] = (
+            f'inline; filename="{get_schema_path(format).name}"'
+        )
+        return response
+
+
 @dataclass
 class ObservationData:  # pylint: disable=too-many-instance-attributes
     id: int
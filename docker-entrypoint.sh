@@ -2,4 +2,27 @@
 
 set -e
 
-gunicorn --bind 0.0.0.0:8080 --timeout 600 lidotiku.wsgi
+# The worker processes share their Prometheus metrics through files in this
+# directory, which must be empty when the server starts, see api.metrics
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "${PROMETHEUS_MULTIPROC_DIR:?}"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Render the OpenAPI schema served by /schema/ with the data sources of the
+# database, failing the start if the database is not reachable
+export OPENAPI_SCHEMA_DIR="${OPENAPI_SCHEMA_DIR:-/tmp/openapi-schema}"
+python manage.py render_schema
+
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    # Views run in a thread per request, so the database pool bounds how
+    # many requests query the database at once
+    export DATABASE_POOL_MAX_SIZE="${DATABASE_POOL_MAX_SIZE:-10}"
+    gunicorn --bind 0.0.0.0:8080 --timeout 600 \
+        --workers "${GUNICORN_WORKERS:-1}" \
+        --worker-class uvicorn_worker.UvicornWorker \
+        lidotiku.asgi
+else
+    gunicorn --bind 0.0.0.0:8080 --timeout 600 \
+        --workers "${GUNICORN_WORKERS:-1}" --threads "${GUNICORN_THREADS:-1}" \
+        lidotiku.wsgi
+fi
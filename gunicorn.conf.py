@@ -1,4 +1,7 @@
+import os
+
 from logger_extra.extras.gunicorn import JsonErrorFormatter, JsonFormatter
+from prometheus_client import multiprocess
 
 logconfig_dict = {
     "version": 1,
@@ -47,3 +50,9 @@ logconfig_dict = {
         },
     },
 }
+
+
+def child_exit(server, worker):
+    # Drops the live metrics of the exited worker, see api.metrics
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(worker.pid)
@@ -24,6 +24,13 @@ GEOS_LIBRARY_PATH = os.environ.get("GEOS_LIBRARY_PATH")
 
 env = environ.Env(
     DATABASE_PASSWORD=(str, ""),
+    DATABASE_POOL_ENABLED=(bool, True),
+    DATABASE_POOL_MIN_SIZE=(int, 1),
+    DATABASE_POOL_MAX_SIZE=(int, None),
+    DATABASE_POOL_TIMEOUT=(float, 30.0),
+    DATABASE_CONN_MAX_AGE=(int, 600),
+    DATABASE_CONN_HEALTH_CHECKS=(bool, True),
+    GUNICORN_THREADS=(int, 1),
     DEBUG=(bool, False),
     SECRET_KEY=(str, ""),
     ALLOWED_HOSTS=(list, []),
@@ -32,8 +39,20 @@ env = environ.Env(
     SENTRY_PROFILE_SESSION_SAMPLE_RATE=(float, None),
     SENTRY_RELEASE=(str, None),
     SENTRY_TRACES_SAMPLE_RATE=(float, None),
-    SENTRY_TRACES_IGNORE_PATHS=(list, ["/healthz", "/readiness"]),
+    SENTRY_TRACES_IGNORE_PATHS=(list, ["/healthz", "/readiness", "/metrics"]),
     SECURE_PROXY_SSL_HEADER=(tuple, None),
+    OBSERVATION_ROLLUPS_ENABLED=(bool, False),
+    OBSERVATION_DEFAULT_LOOKBACK_DAYS=(int, 30),
+    OBSERVATION_STATEMENT_TIMEOUT=(float, 30.0),
+    OBSERVATION_AGGREGATE_STATEMENT_TIMEOUT=(float, 60.0),
+    OBSERVATION_EXPORT_STATEMENT_TIMEOUT=(float, 300.0),
+    OBSERVATION_QUERY_COST_LIMIT=(float, None),
+    CACHE_URL=(str, "locmemcache://"),
+    API_CACHE_ENABLED=(bool, True),
+    API_CACHE_TIMEOUT=(int, 60 * 60 * 24),
+    JSON_RENDERER=(str, "api.renderers.ORJSONCamelCaseRenderer"),
+    SERVER_TIMING_ENABLED=(bool, True),
+    METRICS_ENABLED=(bool, True),
 )
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -72,12 +91,21 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "logger_extra.middleware.XRequestIdMiddleware",
+    "api.middleware.RequestMetricsMiddleware",
+    "api.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.gzip.GZipMiddleware",
+    "api.middleware.TimedGZipMiddleware",
     "djangorestframework_camel_case.middleware.CamelCaseMiddleWare",
 ]
 
+# Measure the phases of each request into the Server-Timing header and the
+# "Request timing" log records, see api.middleware.ServerTimingMiddleware
+SERVER_TIMING_ENABLED = env("SERVER_TIMING_ENABLED")
+
+# Serve Prometheus metrics of the requests at /metrics, see api.metrics
+METRICS_ENABLED = env("METRICS_ENABLED")
+
 ROOT_URLCONF = "lidotiku.urls"
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -88,6 +116,11 @@ CORS_ALLOW_HEADERS = (
     "sentry-trace",
 )
 
+CORS_EXPOSE_HEADERS = (
+    "Observation-Window-Start",
+    "Observation-Window-End",
+)
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -113,6 +146,50 @@ DATABASES = {"default": env.db_url(engine="django.contrib.gis.db.backends.postgi
 if env("DATABASE_PASSWORD"):
     DATABASES["default"]["PASSWORD"] = env("DATABASE_PASSWORD")
 
+# Each gunicorn worker process has its own pool, sized by default for one
+# connection per worker thread (GUNICORN_THREADS in docker-entrypoint.sh).
+# Without the pool, connections persist between requests for CONN_MAX_AGE.
+if env("DATABASE_POOL_ENABLED"):
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": env("DATABASE_POOL_MIN_SIZE"),
+        "max_size": env("DATABASE_POOL_MAX_SIZE")
+        or max(env("GUNICORN_THREADS"), env("DATABASE_POOL_MIN_SIZE")),
+        "timeout": env("DATABASE_POOL_TIMEOUT"),
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = env("DATABASE_CONN_MAX_AGE")
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = env("DATABASE_CONN_HEALTH_CHECKS")
+
+# Serve aggregates from the rollup tables maintained by the
+# refresh_observation_rollups management command
+OBSERVATION_ROLLUPS_ENABLED = env("OBSERVATION_ROLLUPS_ENABLED")
+
+# Days of observations listed before the end date, or before the latest
+# stored observation, when no start date is given
+OBSERVATION_DEFAULT_LOOKBACK_DAYS = env("OBSERVATION_DEFAULT_LOOKBACK_DAYS")
+
+# Seconds after which the queries of the observation endpoints are canceled
+# and answered with 503, 0 for no limit. See api.views.QueryLimitMixin.
+OBSERVATION_STATEMENT_TIMEOUT = env("OBSERVATION_STATEMENT_TIMEOUT")
+OBSERVATION_AGGREGATE_STATEMENT_TIMEOUT = env("OBSERVATION_AGGREGATE_STATEMENT_TIMEOUT")
+OBSERVATION_EXPORT_STATEMENT_TIMEOUT = env("OBSERVATION_EXPORT_STATEMENT_TIMEOUT")
+
+# Observation queries whose planner cost estimate exceeds this are rejected
+# with 400 before running, unlimited by default
+OBSERVATION_QUERY_COST_LIMIT = env("OBSERVATION_QUERY_COST_LIMIT")
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default, e.g. CACHE_URL=redis://redis:6379/0 for a shared cache
+
+CACHES = {"default": env.cache_url("CACHE_URL")}
+
+# Cache rendered counter and data source responses until the data changes,
+# see api.caching. The timeout only evicts entries which are no longer used.
+API_CACHE_ENABLED = env("API_CACHE_ENABLED")
+API_CACHE_TIMEOUT = env("API_CACHE_TIMEOUT")
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -135,13 +212,17 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Renderer of the JSON format, api.renderers.FastCamelCaseJSONRenderer encodes
+# with the standard library json module instead of orjson
+JSON_RENDERER = env("JSON_RENDERER")
+
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 100,
     "DEFAULT_RENDERER_CLASSES": (
-        "djangorestframework_camel_case.render.CamelCaseJSONRenderer",
+        JSON_RENDERER,
         "djangorestframework_camel_case.render.CamelCaseBrowsableAPIRenderer",
-        "rest_framework_csv.renderers.PaginatedCSVRenderer",
+        "api.renderers.FixedColumnsCSVRenderer",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [],
@@ -152,6 +233,10 @@ REST_FRAMEWORK = {
     "UNAUTHENTICATED_USER": None,  # Required for removing django.contrib.contenttypes
 }
 
+# Directory of the OpenAPI schema files served by /schema/, rendered with the
+# render_schema management command
+OPENAPI_SCHEMA_DIR = env("OPENAPI_SCHEMA_DIR", default=str(BASE_DIR / "openapi-schema"))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "LIDO-TIKU API",
     "DESCRIPTION": "API for accessing traffic measurement data of "
@@ -168,6 +253,10 @@ SPECTACULAR_SETTINGS = {
     "is included:\nSource: City of Helsinki, https://lidotiku.api.hel.fi/api/ ,"
     "licence CC 4.0 BY: http://creativecommons.org/licenses/by/4.0/",
     "SERVE_INCLUDE_SCHEMA": False,
+    "POSTPROCESSING_HOOKS": [
+        "drf_spectacular.hooks.postprocess_schema_enums",
+        "api.utils.source_enum_postprocessing_hook",
+    ],
     "VERSION": "v1",
     "LICENSE": {
         "name": "Creative Commons 4.0 BY",
@@ -205,6 +294,11 @@ LOGGING = {
             "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"),
             "propagate": False,
         },
+        "api": {
+            "handlers": ["console"],
+            "level": os.getenv("API_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
     },
 }
 
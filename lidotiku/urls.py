@@ -15,12 +15,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
+
+from api.metrics import metrics_view
+from api.views import StaticSchemaView
 
 urlpatterns = [
     path("api/", include("api.urls")),
-    path("schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("schema/", StaticSchemaView.as_view(), name="schema"),
     path(
         "swagger",
         SpectacularSwaggerView.as_view(url_name="schema"),
@@ -28,3 +32,6 @@ urlpatterns = [
     ),
     path("", include("helsinki_health_endpoints.urls")),
 ]
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path("metrics", metrics_view, name="metrics"))